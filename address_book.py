@@ -1,80 +1,335 @@
-import sqlite3
+import threading
+from backup import DEFAULT_BACKUP_PAGES, restore, snapshot
+from cache import QueryCache
 from contact import Contact
+from contact_index import ContactIndex
+from csv_import import DEFAULT_BATCH_SIZE, import_csv
+from dedup import DUPLICATE_RULES
+from exporters import export_contacts
+from fuzzy import NameIndex
+from journal import applied_seq, apply_changes, compact_journal, current_seq, export_changes
+from db import DEFAULT_RETRY, ConnectionManager
+from repository import DEFAULT_PAGE_SIZE, ContactRepository
+from write_queue import WriteQueue
 
 class AddressBook:
-    def __init__(self, db_file="address_book.db"):
+    def __init__(self, db_file="address_book.db", cache_size=256, cache_ttl=None, instrumentation=None,
+                 busy_timeout_ms=None, retry=DEFAULT_RETRY, queued_writes=False):
         self.db_file = db_file
-        self._create_table()
+        # An Instrumentation records every query this book runs; see query_stats().
+        self.instrumentation = instrumentation
+        # Writers in other processes are waited for up to busy_timeout_ms,
+        # then retried per ``retry`` (see db.RetryPolicy).
+        self._db = ConnectionManager(db_file, instrumentation=instrumentation, busy_timeout_ms=busy_timeout_ms,
+                                     retry=retry)
+        self.contacts = ContactRepository(self._db)
+        # With queued_writes, writes from every thread run on one writer
+        # thread that commits concurrent ones together; see write_queue.py.
+        self._writes = WriteQueue(self._db) if queued_writes else None
+        # Read results are cached until the next write through this book. Writes
+        # from other processes are caught by comparing PRAGMA data_version.
+        self._cache = QueryCache(lambda: self._db.write_generation, maxsize=cache_size, ttl=cache_ttl)
+        self._data_versions = threading.local()
+        # Optional in-memory search index, see enable_index().
+        self.index = None
+        # Names for fuzzy_search() while no index is enabled.
+        self._names = None
+        self._index_lock = threading.Lock()
+        # The change journal's sequence number that whichever of the two is
+        # in use reflects. Every connection sees the same one, so unlike
+        # data_version it tells a new thread whether the index is current.
+        self._index_seq = None
 
-    def _create_table(self):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS contacts
-                     (id INTEGER PRIMARY KEY, name TEXT, phone TEXT, group_name TEXT)''')
-        conn.commit()
-        conn.close()
+    def close(self):
+        if self._writes is not None:
+            self._writes.close()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def transaction(self):
+        return self._db.transaction()
+
+    def cache_stats(self):
+        return self._cache.stats()
+
+    def query_stats(self):
+        """Return Instrumentation.snapshot() with the cache stats, or None without instrumentation."""
+        if self.instrumentation is None:
+            return None
+        return dict(self.instrumentation.snapshot(), cache=self.cache_stats())
+
+    def enable_index(self):
+        """Keep an in-memory ContactIndex for search_as_you_type() and fuzzy_search().
+
+        search_contact always queries SQLite, so enabling the index never
+        changes what it returns. Writes through this book patch the index in
+        place; anything else that changes the table (bulk updates, imports,
+        other connections) marks it stale and it is rebuilt on the next lookup.
+        """
+        self._check_external_writes()
+        with self._index_lock:
+            self.index = ContactIndex()
+            self._names = None
+            self._rebuild_index(self.index)
+
+    def _live_index(self):
+        # The index writes keep current: the ContactIndex once enabled,
+        # otherwise the NameIndex of fuzzy_search(), once it was built.
+        return self.index if self.index is not None else self._names
+
+    def _rebuild_index(self, index):
+        # The sequence number is read first: a write committed while the
+        # rows are read only makes the next lookup rebuild again.
+        # Built inside a transaction, it may hold rows that are rolled back.
+        seq = None if self._db.in_transaction() else current_seq(self._db.connect())
+        index.build(self.contacts.name_phone_rows())
+        self._index_seq = seq
+
+    def _indexed_write(self, write, patch=None):
+        # ``patch(index, result)`` applies the write to the index in use. It
+        # runs only if the index was current when the write's transaction
+        # began, so the write is the only change since; otherwise the index
+        # goes stale and is rebuilt on the next lookup.
+        if self._writes is not None:
+            # A group commit ends many writes at once, so there is no single
+            # write to patch in; the journal moves on and the index is
+            # rebuilt on the next lookup.
+            return self._writes.write(write)
+        if self._live_index() is None:
+            return write()
+        with self._index_lock:
+            index = self._live_index()
+            if patch is None or self._db.in_transaction():
+                # An enclosing transaction may still roll the write back.
+                self._index_seq = None
+                return write()
+            with self._db.transaction() as conn:
+                before = current_seq(conn)
+                result = write()
+                after = current_seq(conn)
+            if self._index_seq == before:
+                patch(index, result)
+                self._index_seq = after
+            else:
+                self._index_seq = None
+        return result
+
+    def _from_index(self, lookup):
+        # ``lookup`` maps the index in use, built first if need be, to a list
+        # of ids; returns their Contacts in that order.
+        with self._index_lock:
+            if self._db.in_transaction():
+                # Uncommitted rows must not reach the shared index; a private
+                # one built from this transaction's view sees them.
+                index = ContactIndex() if self.index is not None else NameIndex()
+                index.build(self.contacts.name_phone_rows())
+            else:
+                if self._live_index() is None:
+                    self._names = NameIndex()
+                    self._index_seq = None
+                index = self._live_index()
+                if self._index_seq != current_seq(self._db.connect()):
+                    self._rebuild_index(index)
+            ids = lookup(index)
+        return self._in_order(ids)
+
+    def _in_order(self, ids):
+        contacts = {contact.id: contact for contact in self.contacts.get_many(ids)}
+        return [contacts[contact_id] for contact_id in ids if contact_id in contacts]
+
+    def _check_external_writes(self):
+        # data_version only means something compared with an earlier value on
+        # the same connection. A thread's first check, or its first on a new
+        # connection, has nothing to compare with, and the cache may have been
+        # filled before a write it cannot see, so that check invalidates too.
+        conn = self._db.connect()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        seen = getattr(self._data_versions, "seen", None)
+        self._data_versions.seen = (conn, version)
+        if seen != (conn, version):
+            self._cache.invalidate()
+
+    def _cached(self, key, load):
+        if self._db.in_transaction():
+            # Uncommitted rows must not become visible to other threads through the cache.
+            return load()
+        self._check_external_writes()
+        # Callers get their own list, so sorting or trimming it leaves the cache intact.
+        return list(self._cache.get_or_load(key, load))
 
     def add_contact(self, name, phone, group=""):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("INSERT INTO contacts (name, phone, group_name) VALUES (?, ?, ?)", (name, phone, group))
-        conn.commit()
-        conn.close()
+        return self._indexed_write(lambda: self.contacts.add(Contact(name, phone, group)).id,
+                                   lambda index, contact_id: index.add(contact_id, name, phone))
+
+    def add_contacts(self, contacts):
+        return self._indexed_write(lambda: self.contacts.add_many(contacts), self._index_added)
+
+    def _index_added(self, index, ids):
+        index.add_many((contact.id, contact.name, contact.phone) for contact in self.contacts.get_many(ids))
 
     def get_all_contacts(self):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("SELECT * FROM contacts")
-        rows = c.fetchall()
-        contacts = [Contact(row[1], row[2], row[3]) for row in rows]
-        conn.close()
-        return contacts
-
-    def export_to_csv(self, filename):
-        contacts = self.get_all_contacts()
-        with open(filename, 'w') as file:
-            for contact in contacts:
-                file.write(f"{contact.name},{contact.phone},{contact.group}\n")
-
-    def import_from_csv(self, filename):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("DELETE FROM contacts")
-        conn.commit()
-
-        with open(filename, 'r') as file:
-            for line in file:
-                parts = line.strip().split(',')
-                if len(parts) >= 2:
-                    name, phone, group = parts[:3]
-                    c.execute("INSERT INTO contacts (name, phone, group_name) VALUES (?, ?, ?)", (name, phone, group))
-        conn.commit()
-        conn.close()
+        # Builds every Contact at once; iter_contacts() and page() keep memory bounded.
+        return self._cached(("all",), self.contacts.all)
+
+    def get_contacts_by_name(self, name):
+        """Return the contacts called exactly ``name``: what edit_contact and delete_contact act on."""
+        return self.contacts.by_name(name)
+
+    def iter_contacts(self, batch_size=DEFAULT_PAGE_SIZE, filter_text="", group=None):
+        """Yield every contact, or those matching ``filter_text``, by name case-insensitively, then id.
+
+        Contacts are read ``batch_size`` at a time with keyset pagination on
+        the NOCASE name index. ``group`` keeps one group, '' meaning none.
+        """
+        return self.contacts.iter_contacts(filter_text, batch_size, group)
+
+    def page(self, after=None, limit=DEFAULT_PAGE_SIZE, filter_text="", group=None, order="name", descending=False,
+             offset=0):
+        """Return up to ``limit`` contacts in iter_contacts() order sorting after ``after``.
+
+        ``after`` is the (name, id) of the last contact of the previous page,
+        or None for the first page. ``order`` sorts by another column of
+        repository.SORT_ORDERS instead; ``after`` is then the last contact's
+        sort_key() in that order.
+        """
+        return self.contacts.page(filter_text, after, limit, group, order, descending, offset)
+
+    def count_contacts(self, filter_text="", group=None, after=None, order="name", descending=False):
+        """Return how many contacts page() would list, in all or after ``after``."""
+        return self.contacts.count(filter_text, group, after, order, descending)
+
+    def group_counts(self):
+        """Return {group: number of contacts}, '' counting contacts without a group."""
+        return dict(self._cached(("groups",), lambda: list(self.contacts.group_counts().items())))
+
+    def export_to_csv(self, filename, group=None, term=None):
+        return export_contacts(self._db, filename, fmt="csv", group=group, term=term, fts=self.contacts.fts,
+                               phone_index=self.contacts.phone_index)
+
+    def export(self, filename, fmt=None, compress=None, group=None, term=None):
+        return export_contacts(self._db, filename, fmt=fmt, compress=compress, group=group, term=term,
+                               fts=self.contacts.fts, phone_index=self.contacts.phone_index)
+
+    def journal_seq(self):
+        """The sequence number of the latest change; export_changes() from it to pick up only what follows."""
+        return current_seq(self._db.connect())
+
+    def applied_seq(self):
+        """The sequence number of the source book that apply_changes() has brought this one to."""
+        return applied_seq(self._db.connect())
+
+    def export_changes(self, filename, since=0, compress=None):
+        """Write the contacts changed after journal sequence ``since`` to ``filename``; see journal.py."""
+        return export_changes(self._db, filename, since=since, compress=compress)
+
+    def apply_changes(self, filename):
+        """Apply a file written by export_changes() on another database; returns a DeltaReport."""
+        return self._indexed_write(lambda: apply_changes(self._db, filename))
+
+    def compact_journal(self, before=None):
+        return compact_journal(self._db, before)
+
+    def snapshot(self, filename, compact=False, pages=DEFAULT_BACKUP_PAGES, progress=None):
+        """Back up the database to ``filename`` while it stays in use; returns a BackupReport.
+
+        ``compact`` writes a VACUUMed read-only file for backup.open_snapshot().
+        See backup.py.
+        """
+        return snapshot(self._db, filename, compact=compact, pages=pages, progress=progress)
+
+    def restore(self, filename, pages=DEFAULT_BACKUP_PAGES, progress=None, replica=False):
+        """Replace every contact with those of the snapshot ``filename``; returns a BackupReport.
+
+        The change journal carries on from where it was, with everything
+        before the restore out of reach. To start a replica, restore a
+        snapshot of the source book with ``replica=True``, then apply the
+        source's export_changes(since=applied_seq()). See backup.restore().
+        """
+        # Not through the writer queue: the backup API needs a connection
+        # outside any transaction. Queued writes wait on the lock meanwhile.
+        report = restore(self._db, filename, pages, progress, replica)
+        self.contacts = ContactRepository(self._db)
+        self._cache.invalidate()
+        self._index_seq = None
+        return report
+
+    def import_from_csv(self, filename, mode="upsert", key="name", batch_size=DEFAULT_BATCH_SIZE, progress=None,
+                        workers=1):
+        return self._indexed_write(lambda: import_csv(self._db, filename, mode=mode, key=key, batch_size=batch_size,
+                                                      progress=progress, workers=workers))
 
     def delete_contact(self, name):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("DELETE FROM contacts WHERE name=?", (name,))
-        conn.commit()
-        conn.close()
+        # Returns the ids of the deleted rows so views can drop just those items.
+        return self._indexed_write(lambda: self.contacts.delete_by_name(name), self._index_removed)
+
+    def delete_contacts(self, ids):
+        ids = list(ids)
+        return self._indexed_write(lambda: self.contacts.delete_many(ids),
+                                   lambda index, deleted: self._index_removed(index, ids))
+
+    def _index_removed(self, index, ids):
+        for contact_id in ids:
+            index.remove(contact_id)
 
     def edit_contact(self, name, new_phone, new_group=""):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("UPDATE contacts SET phone=?, group_name=? WHERE name=?", (new_phone, new_group, name))
-        conn.commit()
-        conn.close()
+        # Returns the ids of the updated rows so views can patch just those items.
+        def patch(index, ids):
+            for contact_id in ids:
+                index.update(contact_id, name, new_phone)
+        return self._indexed_write(lambda: self.contacts.update_by_name(name, new_phone, new_group), patch)
+
+    def find_duplicates(self, rules=DUPLICATE_RULES):
+        """Return DuplicateGroups of contacts that look like the same person; see dedup.py."""
+        return self.contacts.find_duplicates(rules)
+
+    def merge_contacts(self, keep_id, duplicate_ids):
+        """Fold ``duplicate_ids`` into the contact ``keep_id``; returns the merged Contact or None."""
+        duplicate_ids = list(duplicate_ids)
+
+        def patch(index, kept):
+            for contact_id in duplicate_ids:
+                if contact_id != keep_id:
+                    index.remove(contact_id)
+            if kept is not None:
+                index.update(kept.id, kept.name, kept.phone)
+        return self._indexed_write(lambda: self.contacts.merge(keep_id, duplicate_ids), patch)
+
+    def update_contacts(self, updates):
+        # Takes (name, new_phone, new_group) tuples, keyed on name like edit_contact.
+        return self._indexed_write(lambda: self.contacts.update_many_by_name(updates))
 
     def search_contact(self, term):
-        conn = sqlite3.connect(self.db_file)
-        c = conn.cursor()
-        c.execute("SELECT * FROM contacts WHERE name LIKE ? OR phone LIKE ? OR group_name LIKE ?", ('%'+term+'%', '%'+term+'%', '%'+term+'%'))
-        rows = c.fetchall()
-        contacts = [Contact(row[1], row[2], row[3]) for row in rows]
-        conn.close()
-        return contacts
+        return self._cached(("search", term), lambda: self.contacts.search(term))
+
+    def search_as_you_type(self, term, limit=None):
+        """Return contacts whose name or phone contains ``term``, in name order, from the in-memory index.
+
+        This is the lookup a search box runs on every keystroke, not
+        search_contact answered another way: email, group and notes are not
+        searched, terms under three characters only match the start of a
+        name or phone, and results are not ranked. The index is built on
+        first use, as by enable_index().
+        """
+        if self.index is None:
+            self.enable_index()
+        return self._cached(("as_you_type", term, limit),
+                            lambda: self._from_index(lambda index: index.search(term, limit)))
+
+    def fuzzy_search(self, term, limit=10):
+        """Return up to ``limit`` contacts whose names best match ``term`` despite typos, best first.
+
+        Runs on the in-memory index if enable_index() was called, and otherwise
+        on a NameIndex of the names alone, built on first use and patched by
+        writes through this book like the index; either way search_contact
+        is unaffected.
+        """
+        return self._cached(("fuzzy", term, limit), lambda: self._from_index(lambda index: index.fuzzy(term, limit)))
 
     def _sort_contacts(self):
-        contacts = self.get_all_contacts()
-        contacts.sort(key=lambda x: x.name.lower())
-        return contacts
+        # Ordered by SQLite through the NOCASE name index rather than re-sorted here.
+        return self._cached(("sorted",), self.contacts.all_by_name)
@@ -1,8 +1,12 @@
 import tkinter as tk
-from tkinter import messagebox, ttk
-from PIL import Image, ImageTk
+from tkinter import messagebox
 from tkinter import filedialog
 from address_book import AddressBook
+from contact import Contact
+from contact_tree import ContactTreeView
+from icon_cache import icon_path
+
+ICON_SIZE = 24
 
 class AddressBookGUI:
     def __init__(self, root):
@@ -39,82 +43,121 @@ class AddressBookGUI:
         self.group_entry = tk.Entry(self.frame, width=30)
         self.group_entry.grid(row=2, column=1, padx=10, pady=5, sticky="w")
 
-        self.add_icon = Image.open("icons/add.png").resize((24, 24))
-        self.add_icon = ImageTk.PhotoImage(self.add_icon)
+        self.add_icon = tk.PhotoImage(file=icon_path("add", ICON_SIZE))
 
         self.add_button = tk.Button(
             self.frame, text="Add Contact", image=self.add_icon, compound=tk.LEFT, command=self.add_contact, bg="#4caf50", fg="white", relief=tk.FLAT
         )
         self.add_button.grid(row=3, column=1, pady=10, sticky="e")
 
-        self.view_icon = Image.open("icons/view.png").resize((24, 24))
-        self.view_icon = ImageTk.PhotoImage(self.view_icon)
+        self.view_icon = tk.PhotoImage(file=icon_path("view", ICON_SIZE))
 
         self.view_button = tk.Button(
             self.frame, text="View Contacts", image=self.view_icon, compound=tk.LEFT, command=self.view_contacts, bg="#2196f3", fg="white", relief=tk.FLAT
         )
         self.view_button.grid(row=4, column=1, pady=10, sticky="e")
 
-        self.export_icon = Image.open("icons/export.png").resize((24, 24))
-        self.export_icon = ImageTk.PhotoImage(self.export_icon)
+        self.export_icon = tk.PhotoImage(file=icon_path("export", ICON_SIZE))
 
         self.export_button = tk.Button(
             self.frame, text="Export to CSV", image=self.export_icon, compound=tk.LEFT, command=self.export_to_csv, bg="#ff9800", fg="white", relief=tk.FLAT
         )
         self.export_button.grid(row=5, column=1, pady=10, sticky="e")
 
-        self.import_icon = Image.open("icons/import.png").resize((24, 24))
-        self.import_icon = ImageTk.PhotoImage(self.import_icon)
+        self.import_icon = tk.PhotoImage(file=icon_path("import", ICON_SIZE))
 
         self.import_button = tk.Button(
             self.frame, text="Import from CSV", image=self.import_icon, compound=tk.LEFT, command=self.import_from_csv, bg="#795548", fg="white", relief=tk.FLAT
         )
         self.import_button.grid(row=6, column=1, pady=10, sticky="e")
 
-        self.contacts_tree = ttk.Treeview(self.root, columns=("Name", "Phone", "Group"), selectmode="browse")
-        self.contacts_tree.heading("#0", text="ID")
-        self.contacts_tree.column("#0", width=50, stretch=tk.NO)
-        self.contacts_tree.heading("Name", text="Name")
-        self.contacts_tree.heading("Phone", text="Phone")
-        self.contacts_tree.heading("Group", text="Group")
-        self.contacts_tree.pack(padx=20, pady=20, fill="both", expand=True)
+        self.update_button = tk.Button(
+            self.frame, text="Update Contact", command=self.edit_contact, bg="#607d8b", fg="white", relief=tk.FLAT
+        )
+        self.update_button.grid(row=7, column=1, pady=10, sticky="e")
 
-        self.load_contacts()
+        self.delete_button = tk.Button(
+            self.frame, text="Delete Contact", command=self.delete_contact, bg="#f44336", fg="white", relief=tk.FLAT
+        )
+        self.delete_button.grid(row=8, column=1, pady=10, sticky="e")
+
+        # Only the rows in view are ever read or put in the tree.
+        self.contacts_view = ContactTreeView(self.root, self.address_book, on_select=self.on_select)
+        self.contacts_view.pack(padx=20, pady=20, fill="both", expand=True)
+
+        # The window is drawn first; the list fills in from the event loop.
+        self.root.after_idle(self.load_contacts)
 
     def add_contact(self):
         name = self.name_entry.get()
         phone = self.phone_entry.get()
         group = self.group_entry.get()
         if name and phone:
-            self.address_book.add_contact(name, phone, group)
-            self.load_contacts()
+            contact = Contact(name, phone, group, self.address_book.add_contact(name, phone, group))
+            self.contacts_view.contacts_changed(added=[contact])
+            self.contacts_view.show(contact)
             messagebox.showinfo("Success", f"Contact '{name}' added successfully!")
         else:
             messagebox.showerror("Error", "Please enter both name and phone number.")
 
+    def edit_contact(self):
+        name = self.name_entry.get()
+        phone = self.phone_entry.get()
+        group = self.group_entry.get()
+        if name and phone:
+            before = self.address_book.get_contacts_by_name(name)
+            ids = self.address_book.edit_contact(name, phone, group)
+            if not ids:
+                messagebox.showerror("Error", f"No contact named '{name}'.")
+                return
+            after = [Contact(contact.name, phone, group, contact.id, email=contact.email, notes=contact.notes)
+                     for contact in before if contact.id in ids]
+            self.contacts_view.contacts_changed(removed=[contact for contact in before if contact.id in ids],
+                                                added=after)
+            messagebox.showinfo("Success", f"Contact '{name}' updated successfully!")
+        else:
+            messagebox.showerror("Error", "Please enter both name and phone number.")
+
+    def delete_contact(self):
+        name = self.name_entry.get()
+        if not name:
+            messagebox.showerror("Error", "Please select or enter a contact to delete.")
+            return
+        if messagebox.askyesno("Delete Contact", f"Are you sure you want to delete {name}?"):
+            before = self.address_book.get_contacts_by_name(name)
+            ids = self.address_book.delete_contact(name)
+            self.contacts_view.contacts_changed(removed=[contact for contact in before if contact.id in ids])
+
+    def on_select(self, contact):
+        for entry, value in ((self.name_entry, contact.name), (self.phone_entry, contact.phone),
+                             (self.group_entry, contact.group)):
+            entry.delete(0, tk.END)
+            entry.insert(0, value)
+
     def view_contacts(self):
         self.load_contacts()
 
     def export_to_csv(self):
-        filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
+        filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[
+            ("CSV files", "*.csv"), ("JSON Lines files", "*.jsonl"), ("vCard files", "*.vcf"),
+            ("Compressed files", "*.gz")])
         if filename:
-            self.address_book.export_to_csv(filename)
+            self.address_book.export(filename)
             messagebox.showinfo("Exported", f"Address book exported to {filename}")
 
     def import_from_csv(self):
         filename = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
         if filename:
-            self.address_book.import_from_csv(filename)
+            report = self.address_book.import_from_csv(filename)
             self.load_contacts()
-            messagebox.showinfo("Imported", f"Address book imported from {filename}")
+            message = f"Address book imported from {filename}\n\n{report}"
+            if report.rejected:
+                line_number, _, reason = report.rejected[0]
+                message += f"\nFirst rejected row: line {line_number} ({reason})"
+            messagebox.showinfo("Imported", message)
 
     def load_contacts(self):
-        for record in self.contacts_tree.get_children():
-            self.contacts_tree.delete(record)
-
-        contacts = self.address_book.get_all_contacts()
-        for idx, contact in enumerate(contacts, start=1):
-            self.contacts_tree.insert("", "end", text=idx, values=(contact.name, contact.phone, contact.group))
+        self.contacts_view.reload()
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,145 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from address_book import AddressBook
+from csv_import import DEFAULT_BATCH_SIZE
+from dedup import DUPLICATE_RULES
+from repository import DEFAULT_PAGE_SIZE
+
+# Reader threads, and so read connections, per AsyncAddressBook.
+DEFAULT_READERS = 4
+
+
+class AsyncAddressBook:
+    """AddressBook for asyncio code: every call runs off the event loop.
+
+    Reads run on a pool of ``readers`` threads, each with its own SQLite
+    connection, so under WAL they proceed in parallel with each other and
+    with a write. Writes run one at a time on a single writer thread, in
+    the order they were awaited, so they never wait on each other's locks.
+
+    Create it with ``await AsyncAddressBook.open(...)``: the database is
+    then opened and migrated on the writer thread, and the book holds at
+    most ``readers`` + 1 connections. The constructor does that work on
+    the calling thread instead, blocking the event loop while it runs, and
+    leaves that thread with a connection of its own, for ``readers`` + 2.
+
+    Callbacks such as an import's ``progress`` are called on the writer
+    thread; use ``loop.call_soon_threadsafe`` to get back to the loop.
+    """
+
+    def __init__(self, db_file="address_book.db", readers=DEFAULT_READERS, **book_options):
+        self._start(readers)
+        self.book = AddressBook(db_file, **book_options)
+
+    @classmethod
+    async def open(cls, db_file="address_book.db", readers=DEFAULT_READERS, **book_options):
+        """Return an AsyncAddressBook whose AddressBook was built on the writer thread."""
+        self = cls.__new__(cls)
+        self._start(readers)
+        try:
+            self.book = await self.write(AddressBook, db_file, **book_options)
+        except BaseException:
+            self._writer.shutdown(wait=False)
+            self._readers.shutdown(wait=False)
+            raise
+        return self
+
+    def _start(self, readers):
+        if readers < 1:
+            raise ValueError("readers must be positive")
+        self._readers = ThreadPoolExecutor(readers, thread_name_prefix="address-book-reader")
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="address-book-writer")
+
+    async def read(self, func, *args, **kwargs):
+        """Run ``func(*args, **kwargs)`` on a reader thread and return its result."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._readers, functools.partial(func, *args, **kwargs))
+
+    async def write(self, func, *args, **kwargs):
+        """Run ``func(*args, **kwargs)`` on the writer thread, after writes already queued."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._writer, functools.partial(func, *args, **kwargs))
+
+    async def close(self):
+        await asyncio.get_running_loop().run_in_executor(None, self._shutdown)
+
+    def _shutdown(self):
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        self.book.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # Reads
+
+    async def get_all_contacts(self):
+        return await self.read(self.book.get_all_contacts)
+
+    async def search_contact(self, term):
+        return await self.read(self.book.search_contact, term)
+
+    async def fuzzy_search(self, term, limit=10):
+        return await self.read(self.book.fuzzy_search, term, limit)
+
+    async def find_duplicates(self, rules=DUPLICATE_RULES):
+        return await self.read(self.book.find_duplicates, rules)
+
+    async def export_to_csv(self, filename, group=None, term=None):
+        return await self.read(self.book.export_to_csv, filename, group=group, term=term)
+
+    async def export(self, filename, fmt=None, compress=None, group=None, term=None):
+        return await self.read(self.book.export, filename, fmt=fmt, compress=compress, group=group, term=term)
+
+    async def group_counts(self):
+        return await self.read(self.book.group_counts)
+
+    async def iter_contacts(self, batch_size=DEFAULT_PAGE_SIZE, filter_text="", group=None):
+        """Yield contacts matching ``filter_text`` by name, case-insensitively, then id.
+
+        Rows are fetched ``batch_size`` at a time, each page a separate
+        keyset query on a reader thread, so no query or transaction stays
+        open while the caller awaits between contacts. Contacts written
+        during the iteration show up if they sort after the current page.
+        """
+        after = None
+        while True:
+            contacts = await self.read(self.book.page, after, batch_size, filter_text, group)
+            for contact in contacts:
+                yield contact
+            if len(contacts) < batch_size:
+                return
+            after = (contacts[-1].name, contacts[-1].id)
+
+    # Writes
+
+    async def add_contact(self, name, phone, group=""):
+        return await self.write(self.book.add_contact, name, phone, group)
+
+    async def add_contacts(self, contacts):
+        return await self.write(self.book.add_contacts, list(contacts))
+
+    async def edit_contact(self, name, new_phone, new_group=""):
+        return await self.write(self.book.edit_contact, name, new_phone, new_group)
+
+    async def update_contacts(self, updates):
+        return await self.write(self.book.update_contacts, list(updates))
+
+    async def delete_contact(self, name):
+        return await self.write(self.book.delete_contact, name)
+
+    async def delete_contacts(self, ids):
+        return await self.write(self.book.delete_contacts, list(ids))
+
+    async def merge_contacts(self, keep_id, duplicate_ids):
+        return await self.write(self.book.merge_contacts, keep_id, list(duplicate_ids))
+
+    async def import_from_csv(self, filename, mode="upsert", key="name", batch_size=DEFAULT_BATCH_SIZE,
+                              progress=None, workers=1):
+        return await self.write(self.book.import_from_csv, filename, mode=mode, key=key, batch_size=batch_size,
+                                progress=progress, workers=workers)
@@ -0,0 +1,156 @@
+"""Online backups through SQLite's backup API, and compact read-only snapshots.
+
+snapshot() copies the live database ``pages`` pages per step. Each step
+holds a read lock only while it runs, and in WAL mode readers and writers
+carry on throughout. A write from another connection between steps makes
+SQLite restart the copy; after MAX_RESTARTS of those the copy is redone
+in a single step, which reads one consistent version of the database in
+one go. The copy is written beside the target and renamed over it only
+once complete, so the target is never a partial file.
+
+With ``compact`` the copy is VACUUMed, switched out of WAL mode and made
+read-only: a single self-contained file that open_snapshot() opens with
+``immutable=1``, so queries against it take no locks, and with memory
+mapping for fast scans.
+"""
+import os
+import sqlite3
+import stat
+import tempfile
+import time
+from pathlib import Path
+
+from journal import current_seq, restart_journal
+from migrations import migrate
+
+# Pages copied per backup step: 4 MB with the default 4 KB pages.
+DEFAULT_BACKUP_PAGES = 1024
+
+# Writes tolerated during a stepped copy before falling back to one step.
+MAX_RESTARTS = 3
+
+# Bytes of a snapshot open_snapshot() maps into memory.
+SNAPSHOT_MMAP_SIZE = 1 << 30
+
+
+class BackupReport:
+    def __init__(self, source, target):
+        self.source = source
+        self.target = target
+        self.pages = 0
+        self.bytes_copied = 0
+        self.restarts = 0
+        self.compacted = False
+        # Size of the snapshot file written; 0 for a restore.
+        self.size = 0
+        self.elapsed = 0.0
+
+    @property
+    def mb_per_sec(self):
+        return self.bytes_copied / self.elapsed / 1e6 if self.elapsed else 0.0
+
+    def __str__(self):
+        text = (f"{self.bytes_copied / 1e6:,.1f} MB copied to {self.target} in {self.elapsed:.2f} s "
+                f"({self.mb_per_sec:,.1f} MB/s)")
+        return text + f", {self.size / 1e6:,.1f} MB on disk" if self.size else text
+
+
+class _Restarted(Exception):
+    pass
+
+
+def _copy(source, target, pages, progress, report):
+    # Runs the backup, counting restarts: a step that leaves more pages to
+    # copy than the one before means the source changed and SQLite began again.
+    page_size = source.execute("PRAGMA page_size").fetchone()[0]
+    state = dict(remaining=None, stepped=pages > 0)
+
+    def step(status, remaining, total):
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            report.restarts += 1
+            if state["stepped"] and report.restarts >= MAX_RESTARTS:
+                raise _Restarted()
+        state["remaining"] = remaining
+        report.pages = total
+        report.bytes_copied = (total - remaining) * page_size
+        if progress is not None:
+            progress(total - remaining, total)
+
+    try:
+        source.backup(target, pages=pages, progress=step)
+    except _Restarted:
+        state.update(remaining=None, stepped=False)
+        source.backup(target, pages=-1, progress=step)
+
+
+def snapshot(db, filename, compact=False, pages=DEFAULT_BACKUP_PAGES, progress=None):
+    """Copy the database behind ConnectionManager ``db`` to ``filename`` and return a BackupReport.
+
+    ``progress(pages_done, pages_total)`` is called after every step, on
+    the calling thread. ``pages`` of -1 copies everything in one step.
+    """
+    report = BackupReport(db.db_file, filename)
+    start = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp = tempfile.mkstemp(suffix=".db", dir=directory)
+    os.close(fd)
+    try:
+        target = sqlite3.connect(tmp)
+        try:
+            _copy(db.connect(), target, pages, progress, report)
+            if compact:
+                target.execute("PRAGMA journal_mode=DELETE")
+                target.execute("VACUUM")
+                report.compacted = True
+        finally:
+            target.close()
+        if compact:
+            os.chmod(tmp, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.replace(tmp, filename)
+    except BaseException:
+        for leftover in (tmp, tmp + "-wal", tmp + "-shm"):
+            if os.path.exists(leftover):
+                os.unlink(leftover)
+        raise
+    report.size = os.path.getsize(filename)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def restore(db, filename, pages=DEFAULT_BACKUP_PAGES, progress=None, replica=False):
+    """Replace the contents of the database behind ``db`` with the snapshot ``filename``.
+
+    The destination stays locked for writing until the copy is done;
+    readers keep seeing the old contents until then. A snapshot from an
+    older version is then migrated, and the change journal carries on past
+    where it was (see journal.restart_journal). With ``replica``, the
+    snapshot is a copy of the book this one follows through deltas, and
+    deltas from the snapshot's journal sequence on apply to the result.
+    Returns a BackupReport.
+    """
+    report = BackupReport(filename, db.db_file)
+    start = time.perf_counter()
+    conn = db.connect()
+    seq = current_seq(conn)
+    source = sqlite3.connect(Path(filename).absolute().as_uri() + "?mode=ro", uri=True)
+    try:
+        _copy(source, conn, pages, progress, report)
+    finally:
+        source.close()
+    migrate(conn)
+    restart_journal(db, seq, applied=current_seq(conn) if replica else None)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def open_snapshot(filename, mmap_size=SNAPSHOT_MMAP_SIZE):
+    """Open a compact snapshot for queries: immutable, read-only and memory-mapped.
+
+    ``immutable=1`` tells SQLite the file cannot change, so it takes no
+    locks and never looks for a WAL; only open files written by
+    snapshot(compact=True) this way.
+    """
+    conn = sqlite3.connect(Path(filename).absolute().as_uri() + "?immutable=1", uri=True)
+    conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+    conn.execute("PRAGMA query_only=1")
+    return conn
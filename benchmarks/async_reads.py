@@ -0,0 +1,76 @@
+"""Measure AsyncAddressBook read throughput by reader pool size, with a writer running alongside.
+
+Each round launches ``--clients`` coroutines that search in a loop while
+one more coroutine keeps adding contacts, and reports searches per second
+and the worst time the event loop went without running (its stall).
+
+Run from the project root:
+
+    python -m benchmarks.async_reads --rows 100000 --readers 1 2 4 8
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from address_book import AddressBook
+from async_address_book import AsyncAddressBook
+from contact import Contact
+
+
+async def measure(book, clients, seconds, terms):
+    deadline = time.perf_counter() + seconds
+    searches = writes = 0
+    stall = 0.0
+
+    async def searcher(rng):
+        nonlocal searches
+        while time.perf_counter() < deadline:
+            await book.search_contact(rng.choice(terms))
+            searches += 1
+
+    async def writer():
+        nonlocal writes
+        while time.perf_counter() < deadline:
+            await book.add_contact(f"Writer {writes}", f"555-{writes:07d}")
+            writes += 1
+
+    async def heartbeat():
+        nonlocal stall
+        while time.perf_counter() < deadline:
+            before = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall = max(stall, time.perf_counter() - before - 0.001)
+
+    await asyncio.gather(writer(), heartbeat(), *(searcher(random.Random(i)) for i in range(clients)))
+    return searches / seconds, writes / seconds, stall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--readers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    terms = [f"Contact {rng.randrange(args.rows)}" for _ in range(1000)]
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "async.db")
+        with AddressBook(db_file) as book:
+            book.add_contacts(Contact(f"Contact {i}", f"555-{i:07d}") for i in range(args.rows))
+        for readers in args.readers:
+            # A cache of 0 makes every search reach SQLite.
+            async def run():
+                async with await AsyncAddressBook.open(db_file, readers=readers, cache_size=0) as book:
+                    return await measure(book, args.clients, args.seconds, terms)
+            searches, writes, stall = asyncio.run(run())
+            print(f"{readers:>2} readers  {searches:>9,.0f} searches/s  {writes:>7,.0f} writes/s  "
+                  f"max loop stall {stall * 1000:>6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Compare per-row add_contact calls with a single add_contacts batch.
+
+Run from the project root:
+
+    python -m benchmarks.bulk_writes --rows 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from address_book import AddressBook
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+    rows = [(f"Contact {i}", f"555-{i:07d}", "Work") for i in range(args.rows)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with AddressBook(os.path.join(tmp, "single.db")) as book:
+            start = time.perf_counter()
+            for name, phone, group in rows:
+                book.add_contact(name, phone, group)
+            single = time.perf_counter() - start
+
+        with AddressBook(os.path.join(tmp, "bulk.db")) as book:
+            start = time.perf_counter()
+            ids = book.add_contacts(rows)
+            bulk = time.perf_counter() - start
+            assert len(ids) == args.rows
+
+            start = time.perf_counter()
+            book.update_contacts((name, phone, "Friends") for name, phone, _ in rows)
+            update = time.perf_counter() - start
+
+            start = time.perf_counter()
+            book.delete_contacts(ids)
+            delete = time.perf_counter() - start
+
+    print(f"add_contact x{args.rows:<10} {args.rows / single:>12,.0f} rows/sec")
+    print(f"add_contacts {args.rows:<11} {args.rows / bulk:>12,.0f} rows/sec")
+    print(f"update_contacts {args.rows:<8} {args.rows / update:>12,.0f} rows/sec")
+    print(f"delete_contacts {args.rows:<8} {args.rows / delete:>12,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Stress concurrent writers: throughput and write latency, direct vs. through the writer queue.
+
+For each count in ``--writers``, that many threads call add_contact() in a
+loop for ``--seconds`` on one AddressBook. In "direct" mode each write is
+its own transaction on the thread's connection; in "queued" mode
+(queued_writes=True) they go through the single writer thread and are
+group-committed. ``--processes`` more processes write to the same file
+alongside, in direct mode, to add contention from outside the book.
+
+Reported per run: writes per second, median, p99 and worst latency of
+one write, and writes that failed (e.g. "database is locked").
+
+Run from the project root:
+
+    python -m benchmarks.concurrent_writes --writers 1 4 16 64 --seconds 5 --processes 2
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from address_book import AddressBook
+
+MODES = ("direct", "queued")
+
+
+def write_loop(book, prefix, deadline, latencies, errors):
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            book.add_contact(f"{prefix}-{i}", f"555-{i:07d}", "Stress")
+        except Exception:
+            errors.append(1)
+        else:
+            latencies.append(time.perf_counter() - start)
+        i += 1
+
+
+def process_writer(db_file, prefix, seconds, results):
+    latencies, errors = [], []
+    with AddressBook(db_file, cache_size=0) as book:
+        write_loop(book, prefix, time.perf_counter() + seconds, latencies, errors)
+    results.put((len(latencies), len(errors)))
+
+
+def run(db_file, mode, writers, seconds, processes):
+    book = AddressBook(db_file, cache_size=0, queued_writes=mode == "queued")
+    results = multiprocessing.Queue()
+    others = [multiprocessing.Process(target=process_writer, args=(db_file, f"p{mode}{writers}-{p}", seconds, results))
+              for p in range(processes)]
+    for process in others:
+        process.start()
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=write_loop, args=(book, f"t{mode}{writers}-{t}", deadline, latencies, errors))
+               for t in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    groups = book._writes.groups if book._writes is not None else len(latencies)
+    book.close()
+    other_writes = other_errors = 0
+    for process in others:
+        writes, failed = results.get()
+        other_writes += writes
+        other_errors += failed
+        process.join()
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0.0
+    median = statistics.median(latencies) if latencies else 0.0
+    print(f"{mode:<7} {writers:>7} {len(latencies) / elapsed:>10,.0f} {median * 1000:>8.2f} {p99 * 1000:>8.2f} "
+          f"{(latencies[-1] if latencies else 0.0) * 1000:>8.1f} {len(latencies) / max(groups, 1):>10.1f} "
+          f"{len(errors):>7} {other_writes / elapsed:>10,.0f} {other_errors:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--processes", type=int, default=0, help="extra processes writing to the same file")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "stress.db")
+        AddressBook(db_file).close()
+        print(f"{'mode':<7} {'writers':>7} {'writes/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+              f"{'per commit':>10} {'errors':>7} {'others/s':>10} {'errors':>7}")
+        for writers in args.writers:
+            for mode in args.modes:
+                run(db_file, mode, writers, args.seconds, args.processes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare connect-per-call writes with the pooled AddressBook connection.
+
+Run from the project root:
+
+    python -m benchmarks.connection_overhead --ops 2000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from address_book import AddressBook
+
+
+def connect_per_call_add(db_file, name, phone, group=""):
+    # The original AddressBook.add_contact: open, insert, commit, close.
+    conn = sqlite3.connect(db_file)
+    c = conn.cursor()
+    c.execute("INSERT INTO contacts (name, phone, group_name) VALUES (?, ?, ?)", (name, phone, group))
+    conn.commit()
+    conn.close()
+
+
+def connect_per_call_search(db_file, term):
+    conn = sqlite3.connect(db_file)
+    c = conn.cursor()
+    c.execute("SELECT * FROM contacts WHERE name LIKE ? OR phone LIKE ? OR group_name LIKE ?", ('%'+term+'%', '%'+term+'%', '%'+term+'%'))
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+
+def timed(label, ops, func):
+    start = time.perf_counter()
+    for i in range(ops):
+        func(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {ops / elapsed:>12,.0f} ops/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before = os.path.join(tmp, "before.db")
+        AddressBook(before).close()
+        # The pooled manager leaves the file in WAL mode; the baseline ran in
+        # the default rollback journal, so switch it back.
+        sqlite3.connect(before).execute("PRAGMA journal_mode=DELETE").fetchone()
+        timed("add_contact (connect per call)", args.ops,
+              lambda i: connect_per_call_add(before, f"Contact {i}", f"555-{i:07d}"))
+        timed("search (connect per call)", args.ops,
+              lambda i: connect_per_call_search(before, f"{i % 100}"))
+
+        with AddressBook(os.path.join(tmp, "after.db")) as book:
+            timed("add_contact (pooled)", args.ops,
+                  lambda i: book.add_contact(f"Contact {i}", f"555-{i:07d}"))
+            timed("search (pooled)", args.ops,
+                  lambda i: book.search_contact(f"{i % 100}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Measure as-you-type lookups: in-memory ContactIndex against SQL search.
+
+Run from the project root:
+
+    python -m benchmarks.contact_index --rows 100000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from contact_index import ContactIndex
+from db import ConnectionManager
+from repository import ContactRepository
+
+FIRST = ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi", "Ivan", "Judy"]
+LAST = ["Smith", "Jones", "Taylor", "Brown", "Williams", "Wilson", "Johnson", "Davies"]
+
+# Each query is typed one keystroke at a time.
+QUERIES = ["Grace Wil", "son 12", "555-0042"]
+
+
+def keystrokes(query):
+    return [query[:i] for i in range(1, len(query) + 1)]
+
+
+def time_lookups(lookup, repeat):
+    samples = []
+    for _ in range(repeat):
+        for query in QUERIES:
+            for prefix in keystrokes(query):
+                start = time.perf_counter()
+                lookup(prefix)
+                samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)], samples[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=200, help="rows fetched per lookup, as for one list page")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with ConnectionManager(os.path.join(tmp, "index.db")) as db:
+            repository = ContactRepository(db)
+            repository.add_many(
+                (f"{FIRST[i % len(FIRST)]} {LAST[i // len(FIRST) % len(LAST)]}{i}", f"555-{i:07d}")
+                for i in range(args.rows))
+
+            start = time.perf_counter()
+            index = ContactIndex.from_repository(repository)
+            build = time.perf_counter() - start
+            memory = index.memory_usage()
+            print(f"build     {build * 1000:>9.1f} ms for {len(index)} contacts")
+            print("memory    " + "  ".join(f"{name} {size / 2**20:.1f} MiB" for name, size in memory.items()))
+
+            lookups = {
+                "sql": lambda text: repository.page(text, None, args.limit),
+                "index": lambda text: repository.get_many(index.search(text, args.limit)),
+            }
+            for label, lookup in lookups.items():
+                median, p99, worst = time_lookups(lookup, args.repeat)
+                print(f"{label:<9} median {median * 1000:>8.2f} ms  p99 {p99 * 1000:>8.2f} ms  "
+                      f"max {worst * 1000:>8.2f} ms per keystroke")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compare memory held by Contact records with and without __slots__.
+
+Run from the project root:
+
+    python -m benchmarks.contact_memory --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from address_book import AddressBook
+from repository import SELECT_CONTACTS
+
+
+class DictContact:
+    # The two Contact classes before they were merged: plain attributes in a per-instance __dict__.
+    def __init__(self, name, phone, email="", group="", notes="", contact_id=None):
+        self.id = contact_id
+        self.name = name
+        self.phone = phone
+        self.email = email
+        self.group = group
+        self.notes = notes
+
+
+def measure(label, load):
+    tracemalloc.start()
+    start = time.perf_counter()
+    contacts = load()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {current / 1e6:>9,.1f} MB  {len(contacts) / elapsed:>12,.0f} rows/sec")
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with AddressBook(os.path.join(tmp, "memory.db")) as book:
+            book.add_contacts((f"Contact {i}", f"555-{i:07d}", "Work") for i in range(args.rows))
+            conn = book.contacts.connection()
+
+            def load_dict_contacts():
+                return [DictContact(row[1], row[2], row[3] or "", row[4] or "", row[5] or "", row[0])
+                        for row in conn.execute(SELECT_CONTACTS)]
+
+            before = measure("__dict__ Contact", load_dict_contacts)
+            after = measure("__slots__ Contact", book.get_all_contacts)
+    print(f"saved {(before - after) / 1e6:,.1f} MB ({1 - after / before:.0%}) for {args.rows:,} contacts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Measure streaming CSV import throughput and peak Python memory.
+
+Run from the project root:
+
+    python -m benchmarks.csv_import --rows 1000000 --mode upsert
+"""
+import argparse
+import csv
+import os
+import tempfile
+import tracemalloc
+
+from address_book import AddressBook
+from csv_import import DEFAULT_BATCH_SIZE, IMPORT_MODES
+
+
+def write_dataset(filename, rows):
+    with open(filename, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        for i in range(rows):
+            writer.writerow([f"Doe, Contact {i}", f"555-{i:07d}", ("Work", "Family", "Friends")[i % 3]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--mode", choices=IMPORT_MODES, default="upsert")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "contacts.csv")
+        write_dataset(filename, args.rows)
+        size_mb = os.path.getsize(filename) / 1e6
+
+        with AddressBook(os.path.join(tmp, "import.db")) as book:
+            tracemalloc.start()
+            report = book.import_from_csv(filename, mode=args.mode, batch_size=args.batch_size)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    print(f"file: {size_mb:,.1f} MB, mode={args.mode}, batch_size={args.batch_size}")
+    print(report)
+    print(f"peak traced memory: {peak / 1e6:,.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
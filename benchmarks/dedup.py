@@ -0,0 +1,68 @@
+"""Time duplicate detection at growing table sizes to check it scales near-linearly.
+
+One contact in ten gets a planted duplicate: the same phone written
+differently, the same email in another case, or the name with one typo.
+Recall is the share of planted pairs that end up in the same group.
+
+Run from the project root:
+
+    python -m benchmarks.dedup --rows 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from address_book import AddressBook
+from benchmarks.fuzzy_search import typo, vocabulary
+from contact import Contact
+
+
+def contacts(rng, count):
+    first_names = vocabulary(rng, 400, 2)
+    last_names = vocabulary(rng, 4000, 3)
+    rows, planted = [], []
+    while len(rows) < count:
+        i = len(rows)
+        name = f"{rng.choice(first_names)} {rng.choice(last_names)}"
+        phone = f"{i // 10000000 % 10}{i % 10000000:07d}"
+        rows.append(Contact(name, f"555-{phone[:3]}-{phone[3:]}", email=f"user{i}@example.com"))
+        if i % 10 == 0:
+            kind = rng.choice(("phone", "email", "name"))
+            if kind == "phone":
+                duplicate = Contact(f"{rng.choice(first_names)} {rng.choice(last_names)}", f"(555) {phone}")
+            elif kind == "email":
+                duplicate = Contact(f"{rng.choice(first_names)} {rng.choice(last_names)}", "",
+                                    email=f"USER{i}@example.com")
+            else:
+                first, last = name.split()
+                duplicate = Contact(f"{first} {typo(rng, last.lower())}", "")
+            planted.append((i + 1, i + 2))
+            rows.append(duplicate)
+    return rows[:count], [pair for pair in planted if pair[1] <= count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (args.rows // 4, args.rows // 2, args.rows):
+            rng = random.Random(args.seed)
+            rows, planted = contacts(rng, size)
+            with AddressBook(os.path.join(tmp, f"dedup{size}.db")) as book:
+                book.add_contacts(rows)
+                start = time.perf_counter()
+                groups = book.find_duplicates()
+                elapsed = time.perf_counter() - start
+            group_of = {contact_id: n for n, group in enumerate(groups) for contact_id in group.ids}
+            found = sum(1 for a, b in planted if a in group_of and group_of.get(a) == group_of.get(b))
+            print(f"{size:>9} rows  {elapsed:>7.2f} s  {elapsed / size * 1e6:>6.2f} us/row  "
+                  f"{len(groups)} groups  recall {found / len(planted):.1%}")
+
+
+if __name__ == "__main__":
+    main()
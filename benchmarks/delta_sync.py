@@ -0,0 +1,65 @@
+"""Compare a full export with a journal delta for keeping a replica in sync.
+
+A table of ``--rows`` contacts is replicated once, then for each count in
+``--changes`` that many contacts are edited, added or deleted, and the
+time to export_to_csv() the whole table is set against export_changes()
+plus apply_changes() of just the delta.
+
+Run from the project root:
+
+    python -m benchmarks.delta_sync --rows 1000000 --changes 10 1000 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from address_book import AddressBook
+from contact import Contact
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--changes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = AddressBook(os.path.join(tmp, "source.db"))
+        replica = AddressBook(os.path.join(tmp, "replica.db"))
+        source.add_contacts(Contact(f"Contact {i:07d}", f"555-{i:07d}", "Work") for i in range(args.rows))
+        delta_file = os.path.join(tmp, "delta.jsonl")
+        seq = source.export_changes(delta_file).seq
+        replica.apply_changes(delta_file)
+
+        print(f"{'changes':>9} {'full export':>12} {'delta export':>13} {'apply':>9} {'delta rows':>11}")
+        for count in args.changes:
+            with source.transaction() as conn:
+                ids = [row[0] for row in conn.execute(
+                    "SELECT id FROM contacts ORDER BY random() LIMIT ?", (count * 2 // 3,))]
+                conn.executemany("UPDATE contacts SET phone = ? WHERE id = ?",
+                                 ((f"556-{rng.randrange(10 ** 7):07d}", contact_id) for contact_id in ids[::2]))
+                conn.executemany("DELETE FROM contacts WHERE id = ?", ((contact_id,) for contact_id in ids[1::2]))
+            source.add_contacts(Contact(f"New {seq}-{i}", f"557-{i:07d}", "Friends")
+                                for i in range(count - len(ids)))
+            full, _ = timed(lambda: source.export_to_csv(os.path.join(tmp, "full.csv")))
+            export, report = timed(lambda: source.export_changes(delta_file, since=seq))
+            apply, _ = timed(lambda: replica.apply_changes(delta_file))
+            seq = report.seq
+            print(f"{count:>9} {full * 1000:>10.1f}ms {export * 1000:>11.1f}ms {apply * 1000:>7.1f}ms "
+                  f"{report.upserted + report.deleted:>11}")
+        source.close()
+        replica.close()
+
+
+if __name__ == "__main__":
+    main()
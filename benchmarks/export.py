@@ -0,0 +1,40 @@
+"""Measure streaming export throughput and peak Python memory per format.
+
+Run from the project root:
+
+    python -m benchmarks.export --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from address_book import AddressBook
+from exporters import WRITERS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with AddressBook(os.path.join(tmp, "export.db")) as book:
+            book.add_contacts((f"Contact {i}", f"555-{i:07d}", ("Work", "Family", "Friends")[i % 3])
+                              for i in range(args.rows))
+            for fmt, writer in WRITERS.items():
+                filename = os.path.join(tmp, "contacts" + writer.extension + (".gz" if args.gzip else ""))
+                tracemalloc.start()
+                start = time.perf_counter()
+                written = book.export(filename, fmt=fmt)
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"{fmt:<6} {written / elapsed:>12,.0f} rows/sec  "
+                      f"peak {peak / 1e6:>6,.2f} MB  file {os.path.getsize(filename) / 1e6:,.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
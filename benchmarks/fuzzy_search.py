@@ -0,0 +1,90 @@
+"""Measure recall and latency of AddressBook.fuzzy_search on misspelled names.
+
+Each query is a stored name with one typo (a substitution, insertion,
+deletion or swap of adjacent letters) in one of its words. A query counts
+as recalled when a contact with the original name is in the top ``--top``.
+Lookups run on the NameIndex fuzzy_search builds for itself, or with
+``--index`` on a full ContactIndex.
+
+Run from the project root:
+
+    python -m benchmarks.fuzzy_search --rows 500000
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+
+from address_book import AddressBook
+
+SYLLABLES = ["an", "ber", "cal", "dor", "el", "fin", "gar", "hol", "is", "jen", "kin", "lor", "mar",
+             "nel", "or", "pet", "quin", "ros", "sam", "ter", "ul", "van", "wel", "yor", "zan"]
+
+
+def vocabulary(rng, count, syllables):
+    names = set()
+    while len(names) < count:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(syllables)).capitalize())
+    return sorted(names)
+
+
+def typo(rng, word):
+    i = rng.randrange(len(word))
+    kind = rng.choice(("substitute", "insert", "delete", "swap"))
+    letter = rng.choice(string.ascii_lowercase)
+    if kind == "substitute":
+        return word[:i] + letter + word[i + 1:]
+    if kind == "insert":
+        return word[:i] + letter + word[i:]
+    if kind == "delete" or i == len(word) - 1:
+        return word[:i] + word[i + 1:]
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--index", action="store_true", help="enable the ContactIndex first")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    first_names = vocabulary(rng, 400, 2)
+    last_names = vocabulary(rng, 4000, 3)
+    names = [f"{rng.choice(first_names)} {rng.choice(last_names)}" for _ in range(args.rows)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with AddressBook(os.path.join(tmp, "fuzzy.db"), cache_size=0) as book:
+            book.add_contacts((name, f"555-{i:07d}") for i, name in enumerate(names))
+            start = time.perf_counter()
+            if args.index:
+                book.enable_index()
+                memory = book.index.memory_usage()["total"]
+            else:
+                book.fuzzy_search("warm up")
+                memory = book._names.memory_usage()
+            print(f"index build {time.perf_counter() - start:.2f} s, {memory / 2**20:.1f} MiB")
+
+            hits, samples = 0, []
+            for name in rng.sample(names, args.queries):
+                parts = name.split()
+                which = rng.randrange(len(parts))
+                parts[which] = typo(rng, parts[which].lower())
+                start = time.perf_counter()
+                results = book.fuzzy_search(" ".join(parts), args.top)
+                samples.append(time.perf_counter() - start)
+                hits += any(contact.name == name for contact in results)
+
+            samples.sort()
+            print(f"recall@{args.top} {hits / args.queries:.1%} over {args.queries} queries")
+            print(f"latency median {statistics.median(samples) * 1000:.2f} ms  "
+                  f"p99 {samples[int(len(samples) * 0.99)] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Measure online backups: copy speed, what they cost concurrent readers, and compact snapshots.
+
+A book of ``--rows`` contacts is snapshotted once per ``--pages`` value
+(-1 copies in a single step) while a reader thread searches it in a loop
+and a writer adds a contact every ``--write-interval`` seconds. Reported
+per run: MB/s, restarts caused by those writes, and the reader's median
+and worst search latency during the copy. Then a compact snapshot is
+taken and restored, and a group count over the whole table is timed on
+the live book and on the snapshot opened with open_snapshot().
+
+Run from the project root:
+
+    python -m benchmarks.online_backup --rows 500000 --pages 64 1024 -1
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from address_book import AddressBook
+from backup import open_snapshot
+from contact import Contact
+
+ANALYTICAL_QUERY = "SELECT group_name, count(*), count(DISTINCT phone_canonical) FROM contacts GROUP BY group_name"
+
+
+def background(func, stop):
+    def loop():
+        while not stop.is_set():
+            func()
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+    return thread
+
+
+def run(book, tmp, pages, write_interval):
+    stop = threading.Event()
+    latencies = []
+
+    def search():
+        start = time.perf_counter()
+        book.page(filter_text="Contact 01", limit=50)
+        latencies.append(time.perf_counter() - start)
+
+    def write():
+        book.add_contact(f"Written {time.perf_counter()}", "555-0000000", "Work")
+        time.sleep(write_interval)
+
+    threads = [background(search, stop)]
+    if write_interval > 0:
+        threads.append(background(write, stop))
+    report = book.snapshot(os.path.join(tmp, f"snapshot{pages}.db"), pages=pages)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    median = statistics.median(latencies) if latencies else 0.0
+    print(f"{pages:>6} {report.mb_per_sec:>8,.0f} {report.elapsed * 1000:>9.0f}ms {report.restarts:>8} "
+          f"{len(latencies):>8} {median * 1000:>8.2f} {max(latencies, default=0.0) * 1000:>8.1f}")
+
+
+def timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--pages", type=int, nargs="+", default=[64, 1024, -1])
+    parser.add_argument("--write-interval", type=float, default=0.5,
+                        help="seconds between concurrent writes; 0 for none")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        book = AddressBook(os.path.join(tmp, "live.db"), cache_size=0)
+        groups = ("Work", "Family", "Friends", None)
+        book.add_contacts(Contact(f"Contact {i:07d}", f"555-{i % 100000:07d}", groups[i % len(groups)])
+                          for i in range(args.rows))
+
+        print(f"{'pages':>6} {'MB/s':>8} {'elapsed':>11} {'restarts':>8} {'searches':>8} "
+              f"{'p50 ms':>8} {'max ms':>8}")
+        for pages in args.pages:
+            run(book, tmp, pages, args.write_interval)
+
+        compact = os.path.join(tmp, "compact.db")
+        report = book.snapshot(compact, compact=True)
+        print(f"\ncompact snapshot: {report}")
+        print(f"restore:          {book.restore(compact)}")
+
+        with book.transaction() as conn:
+            live = timed(lambda: conn.execute(ANALYTICAL_QUERY).fetchall())
+        conn = open_snapshot(compact)
+        snap = timed(lambda: conn.execute(ANALYTICAL_QUERY).fetchall())
+        conn.close()
+        print(f"group count: live {live * 1000:.1f} ms, snapshot {snap * 1000:.1f} ms")
+        book.close()
+
+
+if __name__ == "__main__":
+    main()
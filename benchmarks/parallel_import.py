@@ -0,0 +1,63 @@
+"""Measure CSV import speedup against the number of parsing worker processes.
+
+Each worker count is timed twice: parsing alone (every chunk parsed and
+validated, nothing written) and a full append import into a fresh
+database. Workers only take over parsing; inserts still go through one
+writer, so the full import cannot scale past the time spent writing.
+
+Run from the project root:
+
+    python -m benchmarks.parallel_import --rows 1000000 --workers 1 2 4 8
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+from address_book import AddressBook
+from benchmarks.csv_import import write_dataset
+from csv_import import DEFAULT_CHUNK_BYTES, parse_parallel, parse_row
+from phones import canonical_phone
+
+
+def parse_sequential(filename):
+    with open(filename, newline="", encoding="utf-8-sig") as file:
+        for row in csv.reader(file):
+            canonical_phone(parse_row(row)[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--chunk-bytes", type=int, default=DEFAULT_CHUNK_BYTES)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "contacts.csv")
+        write_dataset(filename, args.rows)
+        print(f"file: {os.path.getsize(filename) / 1e6:,.1f} MB, {args.rows} rows, "
+              f"{os.cpu_count()} cores, chunk {args.chunk_bytes / 1e6:,.1f} MB")
+        print(f"{'workers':>7}  {'parse s':>8}  {'speedup':>7}  {'import s':>8}  {'speedup':>7}  {'rows/s':>9}")
+        base_parse = base_import = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            if workers == 1:
+                parse_sequential(filename)
+            else:
+                for _ in parse_parallel(filename, workers, args.chunk_bytes):
+                    pass
+            parse_time = time.perf_counter() - start
+
+            with AddressBook(os.path.join(tmp, f"import{workers}.db")) as book:
+                report = book.import_from_csv(filename, mode="append", workers=workers)
+            base_parse = base_parse or parse_time
+            base_import = base_import or report.elapsed
+            print(f"{workers:>7}  {parse_time:>8.2f}  {base_parse / parse_time:>6.2f}x  "
+                  f"{report.elapsed:>8.2f}  {base_import / report.elapsed:>6.2f}x  {report.rows_per_sec:>9,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Measure repeated read queries with and without the AddressBook query cache.
+
+Run from the project root:
+
+    python -m benchmarks.query_cache --rows 100000 --repeat 50
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from address_book import AddressBook
+
+TERMS = ["work", "family", "contact 12", "555-0001"]
+
+
+def run(book, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        for term in TERMS:
+            book.search_contact(term)
+        book._sort_contacts()
+        if i % 10 == 9:
+            # An occasional write, as between dashboard refreshes.
+            book.add_contact(f"New {i}", "555-9999", "Work")
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, cache_size in (("uncached", 0), ("cached", 256)):
+            with AddressBook(os.path.join(tmp, f"{label}.db"), cache_size=cache_size) as book:
+                book.add_contacts((f"Contact {i}", f"555-{i:07d}", ("Work", "Family", "Friends")[i % 3])
+                                  for i in range(args.rows))
+                elapsed = run(book, args.repeat)
+                print(f"{label:<9} {elapsed * 1000 / args.repeat:>9.1f} ms per refresh  {book.cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare LIKE scans with the FTS5 indexes for search_contact-style queries.
+
+Phone-like terms ("555-01", "34567") go through the trigram index of phone
+digits in the FTS5 column.
+
+Run from the project root:
+
+    python -m benchmarks.search_latency --rows 100000 --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from address_book import AddressBook
+from search import search_rows
+
+FIRST = ["John", "Jane", "Alice", "Bob", "Carol", "David", "Erin", "Frank", "Grace", "Heidi",
+         "Ivan", "Judy", "Mallory", "Niaj", "Olivia", "Peggy", "Rupert", "Sybil", "Trent", "Walter"]
+LAST = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Wilson",
+        "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee", "Thompson", "White"]
+GROUPS = ["Family", "Friends", "Work", "Other"]
+TERMS = ["jo", "smi", "Walter", "555-01", "34567", "thompson", "fri", "ali wil"]
+
+
+def populate(book, rows, seed=1):
+    rng = random.Random(seed)
+    book.add_contacts(
+        (f"{rng.choice(FIRST)} {rng.choice(LAST)} {i}", f"555-{i % 10000:04d}-{i:07d}", rng.choice(GROUPS))
+        for i in range(rows))
+
+
+def measure(conn, fts, term, repeat, limit):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        search_rows(conn, ("id", "name"), term, fts, limit, phone_index=fts).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, action="append")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=-1,
+                        help="rows fetched per query; -1 returns every match like search_contact")
+    args = parser.parse_args()
+
+    for rows in args.rows or [100000]:
+        with tempfile.TemporaryDirectory() as tmp:
+            with AddressBook(os.path.join(tmp, "search.db")) as book:
+                populate(book, rows)
+                conn = book._db.connect()
+                shown = "all" if args.limit < 0 else f"first {args.limit}"
+                print(f"{rows:,} contacts, {shown} matches, median of {args.repeat}")
+                for term in TERMS:
+                    like = measure(conn, False, term, args.repeat, args.limit)
+                    fts = measure(conn, True, term, args.repeat, args.limit)
+                    print(f"  {term!r:<12} LIKE {like:>9.2f} ms   FTS5 {fts:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
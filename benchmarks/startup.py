@@ -0,0 +1,123 @@
+"""Measure cold start of both GUIs: import, first paint and first usable list.
+
+Every launch is a fresh interpreter, so module imports are really paid
+for. Each child reports three times, all measured from interpreter
+start-up to:
+
+    import   the GUI module and its dependencies are imported
+    paint    the window has been created and drawn once
+    usable   the first contacts are listed and the window accepts input
+
+The database holds ``--rows`` contacts. The icon cache lives in a
+temporary directory; the first launch of the Tk GUI fills it and is
+reported separately as ``cold_icons``, the rest are warm. The Qt window
+runs on the offscreen platform; the Tk one needs a display. A GUI whose
+toolkit is missing is skipped.
+
+Run from the project root:
+
+    python -m benchmarks.startup --rows 100000 --launches 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from address_book import AddressBook
+from contact import Contact
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TK_CHILD = """
+import json, time
+start = time.perf_counter()
+import tkinter as tk
+try:
+    root = tk.Tk()
+except tk.TclError as e:
+    print(json.dumps(dict(skipped=str(e))))
+    raise SystemExit
+from address_book_gui import AddressBookGUI
+imported = time.perf_counter()
+app = AddressBookGUI(root)
+root.update()
+painted = time.perf_counter()
+while app.contacts_view.total is None:
+    root.update()
+usable = time.perf_counter()
+root.destroy()
+print(json.dumps(dict(imported=imported - start, painted=painted - start, usable=usable - start)))
+"""
+
+QT_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+try:
+    from PyQt6.QtWidgets import QApplication
+except ImportError as e:
+    print(json.dumps(dict(skipped=str(e))))
+    raise SystemExit
+from modern_address_book import ModernAddressBook
+imported = time.perf_counter()
+app = QApplication([])
+window = ModernAddressBook(db_file=sys.argv[1])
+window.show()
+app.processEvents()
+painted = time.perf_counter()
+while window.contact_model is None or not window.centralWidget().isEnabled():
+    app.processEvents()
+app.processEvents()
+usable = time.perf_counter()
+window.close()
+print(json.dumps(dict(imported=imported - start, painted=painted - start, usable=usable - start)))
+"""
+
+
+def launch(code, cwd, env, *args):
+    result = subprocess.run([sys.executable, "-c", code, *args], cwd=cwd, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def report(name, samples):
+    print(f"{name:<14} import {statistics.median(s['imported'] for s in samples) * 1000:>8.1f} ms   "
+          f"paint {statistics.median(s['painted'] for s in samples) * 1000:>8.1f} ms   "
+          f"usable {statistics.median(s['usable'] for s in samples) * 1000:>8.1f} ms   ({len(samples)} launches)")
+
+
+def measure(name, code, cwd, env, launches, *args, cold_first=False):
+    samples = [launch(code, cwd, env, *args)]
+    if "skipped" in samples[0]:
+        print(f"{name:<14} skipped: {samples[0]['skipped']}")
+        return
+    if cold_first:
+        report(f"{name} cold_icons", samples)
+        samples = []
+    while len(samples) < launches:
+        samples.append(launch(code, cwd, env, *args))
+    report(name, samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--launches", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The Tk GUI opens address_book.db in its working directory.
+        db_file = os.path.join(tmp, "address_book.db")
+        with AddressBook(db_file) as book:
+            book.add_contacts(Contact(f"Contact {i:07d}", f"555-{i:07d}", "Work") for i in range(args.rows))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])),
+                   XDG_CACHE_HOME=os.path.join(tmp, "cache"))
+
+        measure("tk", TK_CHILD, tmp, env, args.launches, cold_first=True)
+        measure("qt", QT_CHILD, tmp, dict(env, QT_QPA_PLATFORM="offscreen"), args.launches, db_file)
+
+
+if __name__ == "__main__":
+    main()
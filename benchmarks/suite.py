@@ -0,0 +1,212 @@
+"""Time the main AddressBook operations at several table sizes and check them against a baseline.
+
+For each size a synthetic dataset is generated from ``--seed``, so runs
+are comparable, and these cases are timed on a fresh database:
+
+    add_bulk           add_contacts() of the whole dataset
+    add_single         one add_contact() call (median of --single-adds)
+    get_all_contacts   get_all_contacts() with the query cache disabled
+    search_contact     one search_contact() call (median of --searches terms)
+    export_to_csv      export_to_csv() of the whole table
+    import_from_csv    import_from_csv() of the dataset into an empty database
+    qt_load_contacts   ModernAddressBook.load_contacts() plus the first paint,
+                       under the offscreen Qt platform; skipped without PyQt6
+
+Results are written as JSON to ``--output``. With ``--baseline`` each case
+is compared with the same case in that file and the run fails (exit
+status 1) if any takes more than ``--threshold`` longer, as a fraction.
+``--save-baseline`` writes the results as the new baseline instead.
+
+Run from the project root:
+
+    python -m benchmarks.suite --sizes 1000 100000 1000000 --baseline benchmarks/baseline.json
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from address_book import AddressBook
+from benchmarks.fuzzy_search import vocabulary
+from contact import Contact
+
+GROUPS = ("Family", "Friends", "Work", "Other", "")
+DEFAULT_SIZES = (1000, 100000, 1000000)
+DEFAULT_THRESHOLD = 0.25
+
+
+def dataset(seed, size):
+    rng = random.Random(seed)
+    first_names = vocabulary(rng, 300, 2)
+    last_names = vocabulary(rng, 3000, 3)
+    return [Contact(f"{rng.choice(first_names)} {rng.choice(last_names)}", f"555-{i:07d}", rng.choice(GROUPS))
+            for i in range(size)]
+
+
+def search_terms(rng, contacts, count):
+    # A mix of what people type: a full name, a name prefix, part of a phone number.
+    terms = []
+    for _ in range(count):
+        contact = rng.choice(contacts)
+        kind = rng.randrange(3)
+        if kind == 0:
+            terms.append(contact.name)
+        elif kind == 1:
+            terms.append(contact.name.split()[-1][:rng.randint(2, 5)])
+        else:
+            terms.append(contact.phone[-rng.randint(4, 7):])
+    return terms
+
+
+def write_csv(filename, contacts):
+    with open(filename, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["name", "phone", "group"])
+        writer.writerows((contact.name, contact.phone, contact.group) for contact in contacts)
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def case(seconds, **extra):
+    return dict(seconds=round(seconds, 6), **extra)
+
+
+def per_call(samples):
+    samples = sorted(samples)
+    return case(statistics.median(samples), p95=round(samples[int(len(samples) * 0.95)], 6), calls=len(samples))
+
+
+def qt_load_contacts(db_file, repeat):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt6.QtWidgets import QApplication
+    except ImportError:
+        return None
+    from modern_address_book import ModernAddressBook
+    app = QApplication.instance() or QApplication([])
+    window = ModernAddressBook(db_file=db_file)
+    window.show()
+    app.processEvents()
+    # The database opens on a pool thread; the model exists once it is ready.
+    while window.contact_model is None or not window.centralWidget().isEnabled():
+        app.processEvents()
+
+    def load():
+        window.load_contacts()
+        app.processEvents()
+    samples = [timed(load) for _ in range(repeat)]
+    window.close()
+    return case(statistics.median(samples))
+
+
+def run_size(tmp, size, args):
+    contacts = dataset(args.seed, size)
+    rng = random.Random(args.seed)
+    csv_file = os.path.join(tmp, f"contacts{size}.csv")
+    write_csv(csv_file, contacts)
+    db_file = os.path.join(tmp, f"suite{size}.db")
+    results = {}
+
+    with AddressBook(db_file, cache_size=0) as book:
+        results["add_bulk"] = case(timed(lambda: book.add_contacts(contacts)), rows=size)
+        results["add_single"] = per_call(
+            [timed(lambda: book.add_contact(f"Single {i}", f"556-{i:07d}", "Work")) for i in range(args.single_adds)])
+        results["get_all_contacts"] = case(statistics.median(
+            timed(book.get_all_contacts) for _ in range(args.repeat)))
+        results["search_contact"] = per_call(
+            [timed(lambda: book.search_contact(term)) for term in search_terms(rng, contacts, args.searches)])
+        export_file = os.path.join(tmp, f"export{size}.csv")
+        results["export_to_csv"] = case(statistics.median(
+            timed(lambda: book.export_to_csv(export_file)) for _ in range(args.repeat)))
+
+    with AddressBook(os.path.join(tmp, f"import{size}.db")) as book:
+        results["import_from_csv"] = case(timed(lambda: book.import_from_csv(csv_file, mode="append")), rows=size)
+
+    if not args.skip_qt:
+        result = qt_load_contacts(db_file, args.repeat)
+        if result is not None:
+            results["qt_load_contacts"] = result
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print each case against the baseline; return the names of those slower by more than ``threshold``."""
+    regressions = []
+    for size, cases in results["sizes"].items():
+        for name, result in cases.items():
+            base = baseline.get("sizes", {}).get(size, {}).get(name)
+            if base is None:
+                print(f"{size:>9} {name:<18} {result['seconds']:>10.4f} s  (no baseline)")
+                continue
+            ratio = result["seconds"] / base["seconds"] if base["seconds"] else 1.0
+            flag = "REGRESSION" if ratio > 1 + threshold else ""
+            print(f"{size:>9} {name:<18} {result['seconds']:>10.4f} s  baseline {base['seconds']:>10.4f} s  "
+                  f"{ratio:>5.2f}x  {flag}")
+            if flag:
+                regressions.append(f"{size}/{name}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per whole-table case; the median is kept")
+    parser.add_argument("--single-adds", type=int, default=200)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--skip-qt", action="store_true")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    results = {
+        "machine": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "seed": args.seed,
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            results["sizes"][str(size)] = run_size(tmp, size, args)
+            print(f"{size} contacts done", file=sys.stderr)
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    if not args.baseline:
+        compare(results, {}, args.threshold)
+        return
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"baseline written to {args.baseline}")
+        return
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline.get("machine") != results["machine"]:
+        print("note: baseline was recorded on a different machine; compare with care")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}: "
+              f"{', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """LRU cache of query results, optionally expiring entries after ``ttl`` seconds.
+
+    ``generation`` is a callable returning the current write generation of
+    the database. When it moves on, every cached result is dropped before
+    the next lookup, and a result loaded across a write is not stored, so
+    results from before a write are never served.
+    """
+
+    def __init__(self, generation, maxsize=256, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._generation_of = generation
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        # Bumped whenever entries are dropped; a load that straddles a drop is discarded.
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_or_load(self, key, load):
+        generation = self._generation_of()
+        with self._lock:
+            if generation != self._generation:
+                self._drop()
+                self._generation = generation
+            entry = self._entries.get(key)
+            if entry is not None:
+                loaded_at, value = entry
+                if self.ttl is None or self._clock() - loaded_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            epoch = self._epoch
+
+        value = load()
+
+        with self._lock:
+            if (self.maxsize > 0 and epoch == self._epoch
+                    and generation == self._generation_of()):
+                self._entries[key] = (self._clock(), value)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._drop()
+
+    def _drop(self):
+        self._epoch += 1
+        if self._entries:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
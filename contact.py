@@ -1,15 +1,32 @@
 class Contact:
-    def __init__(self, name, phone, group=""):
+    # No per-instance __dict__: a list view or export over a large book can
+    # hold a great many of these at once.
+    __slots__ = ("id", "name", "phone", "email", "group", "notes")
+
+    def __init__(self, name, phone, group="", contact_id=None, email="", notes=""):
+        self.id = contact_id
         self.name = name
         self.phone = phone
         self.group = group
+        self.email = email
+        self.notes = notes
+
+    @classmethod
+    def from_row(cls, row):
+        # row is (id, name, phone, email, group_name, notes), see repository.CONTACT_COLUMNS
+        return cls(row[1], row[2] or "", row[4] or "", row[0], row[3] or "", row[5] or "")
 
     def __str__(self):
         return f"Name: {self.name}, Phone: {self.phone}, Group: {self.group}"
 
+    def __repr__(self):
+        return f"Contact(id={self.id!r}, name={self.name!r}, phone={self.phone!r})"
+
     def to_dict(self):
         return {
             'name': self.name,
             'phone': self.phone,
-            'group': self.group
+            'email': self.email,
+            'group': self.group,
+            'notes': self.notes
         }
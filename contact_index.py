@@ -0,0 +1,405 @@
+import heapq
+import re
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+from fuzzy import WordIndex, best_matches
+from repository import nocase_key
+
+_NON_DIGIT = re.compile(r"\D")
+
+# A batch of add_many() larger than this share of the index rebuilds the
+# trigram postings in one pass instead of inserting into them row by row.
+REBUILD_SHARE = 1 / 64
+
+# Posting list entries checked at a time by a substring search. Each chunk
+# is first narrowed to the ids also in the next shortest list, so stretches
+# of the name order without matches are skipped a chunk at a time.
+SCAN_CHUNK = 1024
+
+
+def phone_digits(phone):
+    return _NON_DIGIT.sub("", phone or "")
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _phone_trigrams(digits):
+    # Keyed apart from name trigrams, which are one character shorter, so a
+    # name scan never reads phone postings and the other way round.
+    return {"#" + gram for gram in _trigrams(digits)}
+
+
+class ContactIndex:
+    """In-process lookup structures for as-you-type search.
+
+    * names sorted the way ``COLLATE NOCASE`` sorts them, for prefix lookup
+      with bisect;
+    * a trigram -> contact id posting list over lower-cased names and phone
+      digits, for substring lookup, each list in name order;
+    * digits-only phone numbers, sorted, for phone prefix lookup;
+    * the words of every name, for typo-tolerant lookup (see fuzzy.py).
+
+    Each contact is kept as (name, phone digits). Posting lists hold exactly
+    the current contacts, in the same (NOCASE name, id) order as the names,
+    so a substring search reads the shortest list of the term's trigrams
+    from the front and stops after ``limit`` matches instead of sorting
+    every candidate. Edits insert into and delete from the lists by bisection.
+    The word lists only grow and are rebuilt once half their ids are stale.
+    """
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        self._records = {}
+        self._name_keys = []
+        self._name_ids = array("q")
+        self._phone_keys = []
+        self._phone_ids = array("q")
+        self._postings = {}
+        self._words = WordIndex()
+        self._stale_words = 0
+
+    @classmethod
+    def from_repository(cls, repository):
+        index = cls()
+        index.build(repository.name_phone_rows())
+        return index
+
+    def build(self, rows):
+        """Replace the index contents with (id, name, phone) rows."""
+        self._clear()
+        self.add_many(rows)
+
+    def __len__(self):
+        return len(self._records)
+
+    # Incremental maintenance
+
+    def add(self, contact_id, name, phone):
+        name, digits = name or "", phone_digits(phone)
+        self._records[contact_id] = (name, digits)
+        key = nocase_key(name)
+        _sorted_insert(self._name_keys, self._name_ids, key, contact_id)
+        if digits:
+            _sorted_insert(self._phone_keys, self._phone_ids, digits, contact_id)
+        for gram in self._grams(name, digits):
+            ids = self._postings.get(gram)
+            if ids is None:
+                self._postings[gram] = array("q", (contact_id,))
+            else:
+                ids.insert(self._posting_position(ids, (key, contact_id)), contact_id)
+        self._words.add(contact_id, name)
+
+    def add_many(self, rows):
+        """Add (id, name, phone) rows, merging them in with one sort instead of an insert each."""
+        names = list(zip(self._name_keys, self._name_ids))
+        phones = list(zip(self._phone_keys, self._phone_ids))
+        added = len(names)
+        for contact_id, name, phone in rows:
+            name, digits = name or "", phone_digits(phone)
+            self._records[contact_id] = (name, digits)
+            names.append((nocase_key(name), contact_id))
+            if digits:
+                phones.append((digits, contact_id))
+        new = names[added:]
+        self._words.add_many((contact_id, self._records[contact_id][0]) for _, contact_id in new)
+        # Both lists are two sorted runs, which sort() merges in linear time.
+        names.sort()
+        phones.sort()
+        self._name_keys = [key for key, _ in names]
+        self._name_ids = array("q", (contact_id for _, contact_id in names))
+        self._phone_keys = [key for key, _ in phones]
+        self._phone_ids = array("q", (contact_id for _, contact_id in phones))
+        if len(new) > len(names) * REBUILD_SHARE:
+            self._rebuild_postings()
+            return
+        for key, contact_id in new:
+            for gram in self._grams(*self._records[contact_id]):
+                ids = self._postings.get(gram)
+                if ids is None:
+                    self._postings[gram] = array("q", (contact_id,))
+                else:
+                    ids.insert(self._posting_position(ids, (key, contact_id)), contact_id)
+
+    def update(self, contact_id, name, phone):
+        self.remove(contact_id)
+        self.add(contact_id, name, phone)
+
+    def remove(self, contact_id):
+        record = self._records.pop(contact_id, None)
+        if record is None:
+            return
+        name, digits = record
+        key = nocase_key(name)
+        _sorted_remove(self._name_keys, self._name_ids, key, contact_id)
+        if digits:
+            _sorted_remove(self._phone_keys, self._phone_ids, digits, contact_id)
+        # Bisecting a posting list reads the names of the ids it probes, so
+        # the record stays until the contact is out of every list.
+        self._records[contact_id] = record
+        for gram in self._grams(name, digits):
+            ids = self._postings[gram]
+            del ids[self._posting_position(ids, (key, contact_id))]
+            if not ids:
+                del self._postings[gram]
+        del self._records[contact_id]
+        self._stale_words += 1
+        if self._stale_words * 2 > len(self._records):
+            self._rebuild_words()
+
+    # Lookups
+
+    def prefix(self, term, limit=None):
+        """Ids of contacts whose name starts with ``term``, in name order."""
+        lo, hi = _prefix_range(self._name_keys, nocase_key(term))
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return self._name_ids[lo:hi].tolist()
+
+    def search(self, term, limit=None, after=None):
+        """Ids of contacts whose name or phone contains ``term``, in name order.
+
+        Terms shorter than three characters match name and phone prefixes.
+        ``after`` is the sort_key() of the last id of a previous page; only
+        contacts sorting after it are returned.
+        """
+        term = term.strip()
+        folded = term.lower()
+        start = 0 if after is None else self._name_position(after)
+        if not folded:
+            return self._name_ids[start:None if limit is None else start + limit].tolist()
+        digits = phone_digits(term)
+        if len(folded) < 3 and not digits:
+            lo, hi = _prefix_range(self._name_keys, nocase_key(term))
+            lo = max(lo, start)
+            return self._name_ids[lo:hi if limit is None else min(hi, lo + limit)].tolist()
+
+        if len(folded) < 3:
+            accept = self._matcher(term, digits)
+            names = _prefix_range(self._name_keys, nocase_key(term))
+            phones = _prefix_range(self._phone_keys, digits)
+            found = names[1] - names[0] + phones[1] - phones[0]
+            if limit is not None and found * found > limit * len(self._records):
+                # Phone prefixes are spread evenly over the name order, so
+                # the first ``limit`` matches are reached after about
+                # limit * len / found rows, fewer than sorting ``found``.
+                return self._walk(accept, limit, start)
+            candidates = set(self._name_ids[max(names[0], start):names[1]])
+            candidates.update(self._phone_ids[phones[0]:phones[1]])
+            return self._ordered(candidates, limit, after)
+
+        # Every match contains all of the term's trigrams, and the lists are
+        # in name order, so the shortest one is scanned from ``after`` on.
+        ids = self._scan(self._posting_lists(_trigrams(folded)), lambda name, _: folded in name.lower(),
+                         limit, after, nocase_key(term))
+        if len(digits) < 3:
+            return ids
+        by_phone = self._scan(self._posting_lists(_phone_trigrams(digits)), lambda _, phone: digits in phone,
+                              limit, after)
+        if not by_phone:
+            return ids
+        return self._ordered(set(ids).union(by_phone), limit)
+
+    def count(self, term, limit=None):
+        """How many contacts ``search(term)`` finds, counting no further than ``limit``."""
+        return len(self.search(term, limit))
+
+    def matches(self, contact_id, term):
+        """Whether ``search(term)`` would include ``contact_id``."""
+        record = self._records.get(contact_id)
+        if record is None:
+            return False
+        term = term.strip()
+        return not term or self._matcher(term, phone_digits(term))(*record)
+
+    def fuzzy(self, term, limit=10):
+        """Ids of the ``limit`` contacts whose names best match ``term`` despite typos, best first.
+
+        See fuzzy.best_matches.
+        """
+        records = self._records
+        return best_matches(self._words, lambda contact_id: records[contact_id][0] if contact_id in records else None,
+                            term, limit)
+
+    def sort_key(self, contact_id):
+        return (nocase_key(self._records[contact_id][0]), contact_id)
+
+    def memory_usage(self):
+        """Approximate bytes held by each structure, including the strings they reference."""
+        records = sys.getsizeof(self._records) + sum(
+            sys.getsizeof(record) + sys.getsizeof(record[0]) + sys.getsizeof(record[1])
+            for record in self._records.values())
+        names = (sys.getsizeof(self._name_keys) + sum(map(sys.getsizeof, self._name_keys))
+                 + sys.getsizeof(self._name_ids))
+        phones = (sys.getsizeof(self._phone_keys) + sum(map(sys.getsizeof, self._phone_keys))
+                  + sys.getsizeof(self._phone_ids))
+        postings = sys.getsizeof(self._postings) + sum(
+            sys.getsizeof(gram) + sys.getsizeof(ids) for gram, ids in self._postings.items())
+        vocabulary = self._words.memory_usage()
+        return {
+            "records": records,
+            "names": names,
+            "phones": phones,
+            "trigrams": postings,
+            "words": vocabulary,
+            "total": records + names + phones + postings + vocabulary,
+        }
+
+    def _grams(self, name, digits):
+        return _trigrams(name.lower()) | _phone_trigrams(digits)
+
+    def _matcher(self, term, digits):
+        folded = term.lower()
+        if len(folded) < 3:
+            key = nocase_key(term)
+            return lambda name, phone_digits: (nocase_key(name).startswith(key)
+                                               or bool(digits) and phone_digits.startswith(digits))
+        if len(digits) >= 3:
+            return lambda name, phone_digits: folded in name.lower() or digits in phone_digits
+        return lambda name, phone_digits: folded in name.lower()
+
+    def _posting_lists(self, grams):
+        # The posting lists of ``grams``, shortest first; none if a gram has no list.
+        lists = [self._postings.get(gram) for gram in grams]
+        if any(ids is None for ids in lists):
+            return []
+        return sorted(lists, key=len)
+
+    def _scan(self, lists, accept, limit, after, prefix=None):
+        # The ids of the shortest of ``lists`` that pass ``accept``, from
+        # ``after`` on. Names starting with ``prefix`` all match and sit
+        # together in both the list and the name order, so that run is
+        # copied from the name order rather than checked name by name.
+        if not lists:
+            return []
+        ids = lists[0]
+        start = 0 if after is None else self._posting_position(ids, after, right=True)
+        segments = [(start, len(ids))]
+        run = None
+        if prefix is not None:
+            lo, hi = _prefix_range(self._name_keys, prefix)
+            if lo < hi:
+                run_start = self._posting_position(ids, (prefix,))
+                run_end = self._posting_position(ids, (prefix + "\U0010ffff",), lo=run_start)
+                segments = [(start, max(run_start, start)), (max(run_end, start), len(ids))]
+                run = self._name_ids[max(lo, 0 if after is None else self._name_position(after)):hi]
+        found = []
+        for i, (begin, end) in enumerate(segments):
+            if i == 1:
+                found.extend(run[:None if limit is None else limit - len(found)].tolist())
+            if self._collect(ids, begin, end, lists[1] if len(lists) > 1 else None, accept, found, limit):
+                break
+        return found[:limit]
+
+    def _collect(self, ids, begin, end, other, accept, found, limit):
+        # Appends the ids in ids[begin:end] that pass ``accept`` to ``found``;
+        # returns whether it reached ``limit``.
+        records = self._records
+        for chunk_start in range(begin, end, SCAN_CHUNK):
+            if limit is not None and len(found) >= limit:
+                return True
+            chunk = ids[chunk_start:min(chunk_start + SCAN_CHUNK, end)]
+            if other is not None:
+                lo = self._posting_position(other, self.sort_key(chunk[0]))
+                hi = self._posting_position(other, self.sort_key(chunk[-1]), right=True, lo=lo)
+                if hi - lo < len(chunk):
+                    keep = set(other[lo:hi])
+                    chunk = [contact_id for contact_id in chunk if contact_id in keep]
+            for contact_id in chunk:
+                if accept(*records[contact_id]):
+                    found.append(contact_id)
+                    if len(found) == limit:
+                        return True
+        return False
+
+    def _posting_position(self, ids, key, right=False, lo=0):
+        # Where ``key``, compared with sort_key() tuples, goes in the posting
+        # list ``ids``: before equal keys, or after them with ``right``.
+        records = self._records
+        hi = len(ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            contact_id = ids[mid]
+            probe = (nocase_key(records[contact_id][0]), contact_id)
+            if probe < key or right and probe == key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _name_position(self, after):
+        # Index in the name order of the first contact sorting after ``after``.
+        key, contact_id = after
+        lo = bisect_left(self._name_keys, key)
+        hi = bisect_right(self._name_keys, key, lo)
+        while lo < hi and self._name_ids[lo] <= contact_id:
+            lo += 1
+        return lo
+
+    def _walk(self, accept, limit, start=0):
+        # The first ``limit`` matches in name order from position ``start``.
+        ids = []
+        records = self._records
+        for contact_id in islice(self._name_ids, start, None):
+            if accept(*records[contact_id]):
+                ids.append(contact_id)
+                if len(ids) == limit:
+                    break
+        return ids
+
+    def _ordered(self, ids, limit, after=None):
+        records = self._records
+        keyed = [(nocase_key(records[contact_id][0]), contact_id) for contact_id in ids]
+        if after is not None:
+            keyed = [key for key in keyed if key > after]
+        keyed = heapq.nsmallest(limit, keyed) if limit is not None else sorted(keyed)
+        return [contact_id for _, contact_id in keyed]
+
+    def _rebuild_postings(self):
+        # Appending in name order leaves every list sorted.
+        postings = {}
+        records = self._records
+        for contact_id in self._name_ids:
+            for gram in self._grams(*records[contact_id]):
+                ids = postings.get(gram)
+                if ids is None:
+                    ids = postings[gram] = array("q")
+                ids.append(contact_id)
+        self._postings = postings
+
+    def _rebuild_words(self):
+        self._words = WordIndex()
+        self._words.add_many((contact_id, name) for contact_id, (name, _) in self._records.items())
+        self._stale_words = 0
+
+
+def _prefix_range(keys, prefix):
+    # Every string starting with ``prefix`` sorts below prefix + the highest code point.
+    return bisect_left(keys, prefix), bisect_left(keys, prefix + "\U0010ffff")
+
+
+def _sorted_insert(keys, ids, key, contact_id):
+    # Equal keys are kept in id order, matching ORDER BY name COLLATE NOCASE, id.
+    lo = bisect_left(keys, key)
+    hi = bisect_right(keys, key, lo)
+    pos = lo
+    while pos < hi and ids[pos] < contact_id:
+        pos += 1
+    keys.insert(pos, key)
+    ids.insert(pos, contact_id)
+
+
+def _sorted_remove(keys, ids, key, contact_id):
+    lo = bisect_left(keys, key)
+    hi = bisect_right(keys, key, lo)
+    for pos in range(lo, hi):
+        if ids[pos] == contact_id:
+            del keys[pos]
+            del ids[pos]
+            return
@@ -0,0 +1,206 @@
+from bisect import bisect_left
+from collections import OrderedDict
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt
+
+from repository import DEFAULT_PAGE_SIZE as PAGE_SIZE, nocase_key
+
+CACHE_SIZE = 2000
+
+# Matches counted from a ContactIndex before count() stops: a short filter on
+# a large book matches too many contacts to count on every keystroke.
+COUNT_LIMIT = 10000
+
+
+def _contact_key(contact):
+    return (nocase_key(contact.name), contact.id)
+
+
+class ContactListModel(QAbstractListModel):
+    """List model that pages contacts in from SQLite as the view scrolls.
+
+    Rows are ordered by name case-insensitively, then id, and fetched with
+    keyset pagination, so each page is a range scan on the NOCASE name index.
+    Only the sort keys of fetched rows are kept; full contacts live in a
+    bounded LRU cache and are re-read by id when a row scrolls back into view.
+
+    With a ContactIndex, filtered lists page from the index the same way,
+    with the last sort key as the bookmark, and only the visible contacts
+    are read from the database. The filter then matches names and phones as
+    ContactIndex.search does, not every field as ContactRepository.page
+    does. The index knows nothing of groups, so lists narrowed to a group
+    always page from SQLite, on the group's own index, and match every field.
+    """
+
+    def __init__(self, repository, index=None, parent=None):
+        super().__init__(parent)
+        self._repository = repository
+        self._index = index
+        self._filter = ""
+        self._group = None
+        self._keys = []
+        self._cache = OrderedDict()
+        self._exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._keys)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._keys):
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            contact = self.contact(index.row())
+            return f"{contact.name} - {contact.phone}" if contact else self._keys[index.row()][0]
+        if role == Qt.ItemDataRole.UserRole:
+            return self.contact(index.row())
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        after = self._keys[-1] if self._keys else None
+        if self._filter and self._use_index():
+            self._fetch_from_index(after)
+            return
+        contacts = self._repository.page(self._filter, after, PAGE_SIZE, self._group)
+        if len(contacts) < PAGE_SIZE:
+            self._exhausted = True
+        if not contacts:
+            return
+        start = len(self._keys)
+        self.beginInsertRows(QModelIndex(), start, start + len(contacts) - 1)
+        self._append(contacts)
+        self.endInsertRows()
+
+    def set_filter(self, text, contacts=None, complete=False, group=None):
+        """Show contacts matching ``text`` in ``group``, optionally seeded with already-queried ones.
+
+        ``contacts`` must be the leading rows of the (name, id) ordering, as
+        returned by ContactRepository.page; ``complete`` says they are all
+        the matches. A ``group`` of None shows every group.
+        """
+        self.beginResetModel()
+        self._filter = text
+        self._group = group
+        self._keys = []
+        self._cache.clear()
+        self._exhausted = complete
+        if text and self._use_index():
+            ids = self._index.search(text, PAGE_SIZE)
+            self._keys = [self._index.sort_key(contact_id) for contact_id in ids]
+            self._exhausted = len(ids) < PAGE_SIZE
+        elif contacts:
+            self._append(contacts)
+        self.endResetModel()
+
+    def _fetch_from_index(self, after):
+        ids = self._index.search(self._filter, PAGE_SIZE, after)
+        if len(ids) < PAGE_SIZE:
+            self._exhausted = True
+        if not ids:
+            return
+        start = len(self._keys)
+        self.beginInsertRows(QModelIndex(), start, start + len(ids) - 1)
+        self._keys.extend(self._index.sort_key(contact_id) for contact_id in ids)
+        self.endInsertRows()
+
+    def count(self):
+        """How many contacts the list holds once fully fetched.
+
+        Counted from the index, it stops past COUNT_LIMIT; see count_capped().
+        """
+        if self._filter and self._use_index():
+            return self._index.count(self._filter, COUNT_LIMIT + 1)
+        return self._repository.count(self._filter, self._group)
+
+    def count_capped(self, total):
+        """Whether ``total`` from count() stands for COUNT_LIMIT or more."""
+        return total > COUNT_LIMIT and bool(self._filter) and self._use_index()
+
+    def _use_index(self):
+        return self._index is not None and self._group is None
+
+    def _matches(self, contact_id):
+        if not self._filter and self._group is None:
+            return True
+        if self._use_index():
+            return self._index.matches(contact_id, self._filter)
+        return self._repository.matches(contact_id, self._filter, self._group)
+
+    def contact(self, row):
+        contact_id = self._keys[row][1]
+        contact = self._cache.get(contact_id)
+        if contact is None:
+            self._load_window(row)
+            contact = self._cache.get(contact_id)
+        else:
+            self._cache.move_to_end(contact_id)
+        return contact
+
+    def contact_added(self, contact):
+        """Insert a newly stored contact at its sorted position; returns its row or -1."""
+        if not self._matches(contact.id):
+            return -1
+        key = _contact_key(contact)
+        row = bisect_left(self._keys, key)
+        if row == len(self._keys) and not self._exhausted:
+            # Sorts after the pages fetched so far; fetchMore will reach it.
+            return -1
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._keys.insert(row, key)
+        self._remember(contact)
+        self.endInsertRows()
+        return row
+
+    def contact_changed(self, old, new):
+        """Refresh one edited contact in place, moving it if its sort key changed."""
+        row = self._row_of(old)
+        if (row >= 0 and _contact_key(old) == _contact_key(new)
+                and self._matches(new.id)):
+            self._remember(new)
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+            return row
+        self.contact_removed(old)
+        return self.contact_added(new)
+
+    def contact_removed(self, contact):
+        row = self._row_of(contact)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._keys[row]
+        self._cache.pop(contact.id, None)
+        self.endRemoveRows()
+
+    def _row_of(self, contact):
+        key = _contact_key(contact)
+        row = bisect_left(self._keys, key)
+        if row < len(self._keys) and self._keys[row] == key:
+            return row
+        # The caller's copy may carry a stale name; fall back to the id.
+        for row, (_, contact_id) in enumerate(self._keys):
+            if contact_id == contact.id:
+                return row
+        return -1
+
+    def _append(self, contacts):
+        for contact in contacts:
+            self._keys.append(_contact_key(contact))
+            self._remember(contact)
+
+    def _load_window(self, row):
+        start = max(0, row - PAGE_SIZE // 2)
+        ids = [contact_id for _, contact_id in self._keys[start:start + PAGE_SIZE]
+               if contact_id not in self._cache]
+        for contact in self._repository.get_many(ids):
+            self._remember(contact)
+
+    def _remember(self, contact):
+        self._cache[contact.id] = contact
+        self._cache.move_to_end(contact.id)
+        while len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
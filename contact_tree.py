@@ -0,0 +1,273 @@
+import tkinter as tk
+from tkinter import font as tkfont
+from tkinter import ttk
+
+from repository import nocase_key, sort_key
+
+# Treeview columns and the repository.SORT_ORDERS entry each heading sorts by.
+COLUMNS = (("#0", "ID", "id"), ("Name", "Name", "name"), ("Phone", "Phone", "phone"), ("Group", "Group", "group"))
+
+# Rows moved per mouse-wheel notch, as Tk's own widgets do.
+WHEEL_ROWS = 3
+
+
+def _order_key(contact, order):
+    # Compares the way ``order``'s ORDER BY does (repository.SORT_ORDERS).
+    if order == "id":
+        return (contact.id,)
+    if order == "phone":
+        return (contact.phone or "", contact.id)
+    if order == "group":
+        return (nocase_key(contact.group or ""), nocase_key(contact.name), contact.id)
+    return (nocase_key(contact.name), contact.id)
+
+
+class ContactTreeView:
+    """A Treeview that shows only the contacts in view, fetched a window at a time.
+
+    The tree holds a fixed pool of items, one per visible row, whose values
+    are rewritten as the list scrolls; memory and redraw cost follow the
+    height of the widget, not the number of contacts. Scrolling by rows or
+    pages is a keyset query from the first or last row shown; dragging the
+    scrollbar jumps with an OFFSET query on the order's index. Clicking a
+    heading sorts by that column with ORDER BY, clicking it again reverses it.
+
+    ``on_select`` is called with the Contact the user selects.
+    """
+
+    def __init__(self, parent, address_book, on_select=None):
+        self.address_book = address_book
+        self.on_select = on_select
+        self.order = "name"
+        self.descending = False
+        # Offset of the first row shown, the rows shown, and the total; total
+        # is None until the first load.
+        self.top = 0
+        self.rows = []
+        self.total = None
+        self.selected_id = None
+        self.pool = []
+        self.visible = 1
+        self._jump = None
+
+        self.row_height = tkfont.nametofont("TkDefaultFont").metrics("linespace") + 4
+        ttk.Style(parent).configure("Contacts.Treeview", rowheight=self.row_height)
+
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=[column for column, _, _ in COLUMNS[1:]], selectmode="browse",
+                                 style="Contacts.Treeview")
+        self.tree.column("#0", width=50, stretch=tk.NO)
+        for column, _, order in COLUMNS:
+            self.tree.heading(column, command=lambda order=order: self.sort_by(order))
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self._update_headings()
+
+        self.tree.bind("<Configure>", self._resized)
+        self.tree.bind("<<TreeviewSelect>>", self._selected)
+        self.tree.bind("<MouseWheel>", lambda event: self.scroll(-WHEEL_ROWS if event.delta > 0 else WHEEL_ROWS))
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(WHEEL_ROWS))
+        self.tree.bind("<Up>", lambda event: self._step(-1))
+        self.tree.bind("<Down>", lambda event: self._step(1))
+        self.tree.bind("<Prior>", lambda event: self.scroll(-self.visible) or "break")
+        self.tree.bind("<Next>", lambda event: self.scroll(self.visible) or "break")
+        self.tree.bind("<Home>", lambda event: self.scroll_to(0) or "break")
+        self.tree.bind("<End>", lambda event: self.scroll_to(self.total or 0) or "break")
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def reload(self):
+        """Re-count the contacts and re-read the rows in view, keeping the scroll position."""
+        self.total = self.address_book.count_contacts()
+        after = None
+        if self.rows:
+            # Re-read from the first row's key, which holds even if that
+            # contact has since been deleted or changed, and re-count the
+            # rows above it, which edits elsewhere may have shifted.
+            before = self._fetch(sort_key(self.rows[0], self.order), 1, backwards=True)
+            if before:
+                after = sort_key(before[0], self.order)
+        self.top = self.address_book.count_contacts(after=after, order=self.order,
+                                                    descending=not self.descending) + 1 if after else 0
+        self.rows = self._fetch(after, self.visible)
+        self._fill()
+        self._render()
+
+    def contacts_changed(self, removed=(), added=()):
+        """Show that ``removed`` contacts left the list and ``added`` ones joined it.
+
+        An edited contact is its old copy removed and its new copy added.
+        Each that sorts above the rows in view moves the scroll position by
+        one, so unlike reload() nothing is counted: the cost does not grow
+        with how far down the list the view is.
+        """
+        if self.total is None or not self.rows:
+            self.reload()
+            return
+        first = _order_key(self.rows[0], self.order)
+
+        def above(contact):
+            key = _order_key(contact, self.order)
+            return key > first if self.descending else key < first
+        self.total += len(added) - len(removed)
+        self.top = max(0, self.top + sum(map(above, added)) - sum(map(above, removed)))
+        # Re-read from the first row's key inclusive, even if that contact
+        # is gone: every key ends in the id, so one id back is just before it.
+        key = sort_key(self.rows[0], self.order)
+        self.rows = self._fetch(key[:-1] + (key[-1] + (1 if self.descending else -1),), self.visible)
+        self._fill()
+        self._render()
+
+    def sort_by(self, order):
+        self.descending = not self.descending if order == self.order else False
+        self.order = order
+        self._update_headings()
+        self.top = 0
+        self.rows = []
+        self.reload()
+
+    def show(self, contact):
+        """Scroll ``contact`` into view and select it."""
+        if self.total is None:
+            return
+        if not any(row.id == contact.id for row in self.rows):
+            position = self.address_book.count_contacts(after=sort_key(contact, self.order), order=self.order,
+                                                        descending=not self.descending)
+            self.scroll_to(position - self.visible // 2)
+        self.selected_id = contact.id
+        self._render()
+
+    def scroll(self, rows):
+        self.scroll_to(self.top + rows)
+
+    def scroll_to(self, top):
+        if self.total is None:
+            return
+        top = max(0, min(top, self.total - self.visible))
+        delta = top - self.top
+        if delta == 0 and len(self.rows) == min(self.visible, self.total):
+            return
+        if self.rows and 0 < delta < len(self.rows):
+            # Forwards from the last row shown.
+            kept = self.rows[delta:]
+            self.rows = kept + self._fetch(sort_key(self.rows[-1], self.order), self.visible - len(kept))
+        elif self.rows and -len(self.rows) < delta <= 0:
+            # Backwards from the first row shown.
+            self.rows = (self._fetch(sort_key(self.rows[0], self.order), -delta, backwards=True)
+                         + self.rows)[:self.visible]
+        else:
+            self.rows = self.address_book.page(None, self.visible, order=self.order, descending=self.descending,
+                                               offset=top)
+        self.top = top
+        self._fill()
+        self._render()
+
+    def yview(self, *args):
+        # Scrollbar command: "moveto fraction" while dragging, "scroll n units|pages" from the arrows.
+        if self.total is None:
+            return
+        if args[0] == "moveto":
+            # A drag sends a stream of these; only the latest is fetched.
+            target = round(float(args[1]) * self.total)
+            if self._jump is None:
+                self.tree.after_idle(self._apply_jump)
+            self._jump = target
+        else:
+            rows = int(args[1]) * (self.visible if args[2] == "pages" else 1)
+            self.scroll(rows)
+
+    def _apply_jump(self):
+        target, self._jump = self._jump, None
+        self.scroll_to(target)
+
+    def _fetch(self, after, limit, backwards=False):
+        if limit <= 0:
+            return []
+        rows = self.address_book.page(after, limit, order=self.order, descending=self.descending != backwards)
+        return rows[::-1] if backwards else rows
+
+    def _fill(self):
+        # Tops the window up after a resize, or when rows were deleted since
+        # the total was counted: later rows first, then earlier ones.
+        if not self.rows and self.top:
+            self.rows = self.address_book.page(None, self.visible, order=self.order, descending=self.descending,
+                                               offset=self.top)
+            if not self.rows:
+                self.top = 0
+        missing = min(self.visible, self.total) - len(self.rows)
+        if missing > 0:
+            self.rows += self._fetch(sort_key(self.rows[-1], self.order) if self.rows else None, missing)
+            missing = min(self.visible, self.total) - len(self.rows)
+        if missing > 0 and self.rows:
+            earlier = self._fetch(sort_key(self.rows[0], self.order), missing, backwards=True)
+            self.rows = earlier + self.rows
+            self.top = max(0, self.top - len(earlier))
+
+    def _render(self):
+        for i, item in enumerate(self.pool):
+            if i < len(self.rows):
+                contact = self.rows[i]
+                self.tree.move(item, "", i)
+                self.tree.item(item, text=contact.id, values=(contact.name, contact.phone, contact.group))
+            else:
+                self.tree.detach(item)
+        selected = [item for item, row in zip(self.pool, self.rows) if row.id == self.selected_id]
+        if selected:
+            self.tree.selection_set(selected)
+            self.tree.focus(selected[0])
+        else:
+            self.tree.selection_set(())
+        if self.total:
+            self.scrollbar.set(self.top / self.total, min(1.0, (self.top + len(self.rows)) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _resized(self, event):
+        # Rows start below the heading; its height is the first row's offset.
+        first = self.tree.bbox(self.pool[0]) if self.pool else None
+        visible = max(1, (event.height - (first[1] if first else self.row_height)) // self.row_height)
+        if visible == self.visible and self.pool:
+            return
+        while len(self.pool) < visible:
+            self.pool.append(self.tree.insert("", "end", iid=f"row{len(self.pool)}"))
+        for item in self.pool[visible:]:
+            self.tree.delete(item)
+        del self.pool[visible:]
+        self.visible = visible
+        self.rows = self.rows[:visible]
+        if self.total is not None:
+            self._fill()
+        self._render()
+
+    def _selected(self, event=None):
+        # Selections made by _render() restore the current one and are ignored.
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self.pool:
+            return
+        index = self.pool.index(selection[0])
+        if index >= len(self.rows) or self.rows[index].id == self.selected_id:
+            return
+        self.selected_id = self.rows[index].id
+        if self.on_select is not None:
+            self.on_select(self.rows[index])
+
+    def _step(self, rows):
+        # Arrow keys move within the window as usual and scroll at its edges.
+        focus = self.tree.focus()
+        index = self.pool.index(focus) + rows if focus in self.pool else 0
+        if 0 <= index < len(self.rows):
+            return None
+        self.scroll(rows)
+        edge = len(self.rows) - 1 if rows > 0 else 0
+        if 0 <= edge < len(self.rows):
+            self.tree.selection_set(self.pool[edge])
+            self.tree.focus(self.pool[edge])
+        return "break"
+
+    def _update_headings(self):
+        arrow = " ▼" if self.descending else " ▲"
+        for column, title, order in COLUMNS:
+            self.tree.heading(column, text=title + (arrow if order == self.order else ""))
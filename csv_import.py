@@ -0,0 +1,273 @@
+import csv
+import io
+import mmap
+import os
+import time
+from collections import deque
+
+from phones import canonical_phone
+
+IMPORT_MODES = ("replace", "append", "upsert")
+UPSERT_KEYS = ("name", "phone")
+DEFAULT_BATCH_SIZE = 5000
+
+# Rejected rows beyond this many are counted but not kept, so a file full of
+# bad rows cannot grow the report without bound.
+MAX_KEPT_REJECTS = 1000
+
+# Keys per "IN (...)" lookup when splitting an upsert batch into updates and inserts.
+_LOOKUP_CHUNK = 500
+
+# Bytes of CSV per chunk handed to a worker process by a parallel import;
+# each chunk is written in one transaction.
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+
+_HEADER = ("name", "phone", "group")
+
+_INSERT = "INSERT INTO contacts (name, phone, group_name, phone_canonical) VALUES (?, ?, ?, ?)"
+
+
+class ImportReport:
+    def __init__(self, filename, mode):
+        self.filename = filename
+        self.mode = mode
+        self.rows_read = 0
+        self.inserted = 0
+        self.updated = 0
+        self.rejected_count = 0
+        self.rejected = []
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_sec(self):
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+    def reject(self, line_number, row, reason):
+        self.rejected_count += 1
+        if len(self.rejected) < MAX_KEPT_REJECTS:
+            self.rejected.append((line_number, row, reason))
+
+    def __str__(self):
+        return (f"{self.rows_read} rows read, {self.inserted} inserted, {self.updated} updated, "
+                f"{self.rejected_count} rejected ({self.rows_per_sec:,.0f} rows/sec)")
+
+
+def parse_row(row):
+    """Return (name, phone, group) for a CSV record, or raise ValueError."""
+    if len(row) < 2:
+        raise ValueError(f"expected at least 2 fields, got {len(row)}")
+    name, phone = row[0].strip(), row[1].strip()
+    group = row[2].strip() if len(row) > 2 else ""
+    if not name:
+        raise ValueError("missing name")
+    if not phone:
+        raise ValueError("missing phone")
+    return name, phone, group
+
+
+def _prepare(row):
+    name, phone, group = parse_row(row)
+    return name, phone, group, canonical_phone(phone)
+
+
+def import_csv(db, filename, mode="upsert", key="name", batch_size=DEFAULT_BATCH_SIZE, progress=None,
+               workers=1, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Stream name,phone[,group] records from a CSV file into the contacts table.
+
+    ``replace`` swaps the table's contents for the file's, ``append``
+    inserts every row and ``upsert`` updates contacts whose ``key`` column
+    matches and inserts the rest; phones match on their canonical form.
+    Rows are committed every ``batch_size`` records and ``progress`` is
+    called with the running report after each commit. A replace is one
+    transaction, with batches as savepoints: the table is cleared just
+    before the first valid rows are written, so a file that cannot be read
+    or has no valid rows leaves the book as it was.
+
+    With ``workers`` > 1 the file is cut into chunks of about
+    ``chunk_bytes`` on record boundaries, parsed and validated by that many
+    worker processes, and written by this thread one chunk per transaction,
+    in file order. Rows, rejects and their line numbers come out exactly as
+    in a sequential import.
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"mode must be one of {IMPORT_MODES}, not {mode!r}")
+    if key not in UPSERT_KEYS:
+        raise ValueError(f"key must be one of {UPSERT_KEYS}, not {key!r}")
+    if batch_size < 1:
+        raise ValueError("batch_size must be positive")
+    if workers < 1:
+        raise ValueError("workers must be positive")
+
+    report = ImportReport(filename, mode)
+    if mode == "replace":
+        with db.transaction():
+            return _import(db, filename, mode, key, batch_size, progress, workers, chunk_bytes, report)
+    return _import(db, filename, mode, key, batch_size, progress, workers, chunk_bytes, report)
+
+
+def _import(db, filename, mode, key, batch_size, progress, workers, chunk_bytes, report):
+    start = time.perf_counter()
+    if workers > 1:
+        for rows, rejects, rows_read in parse_parallel(filename, workers, chunk_bytes):
+            report.rows_read += rows_read
+            for line_number, row, reason in rejects:
+                report.reject(line_number, row, reason)
+            if rows:
+                _write_batch(db, rows, mode, key, report)
+            report.elapsed = time.perf_counter() - start
+            if progress:
+                progress(report)
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    with open(filename, newline="", encoding="utf-8-sig") as file:
+        reader = csv.reader(file)
+        batch = []
+        for row in reader:
+            if not row or (reader.line_num == 1 and _is_header(row)):
+                continue
+            report.rows_read += 1
+            try:
+                batch.append(_prepare(row))
+            except ValueError as e:
+                report.reject(reader.line_num, row, str(e))
+                continue
+            if len(batch) >= batch_size:
+                _write_batch(db, batch, mode, key, report)
+                batch = []
+                report.elapsed = time.perf_counter() - start
+                if progress:
+                    progress(report)
+        if batch:
+            _write_batch(db, batch, mode, key, report)
+
+    report.elapsed = time.perf_counter() - start
+    if progress:
+        progress(report)
+    return report
+
+
+def _is_header(row):
+    return tuple(field.strip().lower() for field in row[:3]) == _HEADER[:len(row)]
+
+
+def record_ranges(filename, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Yield (start, end) byte ranges covering the file, each ending on a record boundary.
+
+    A range is cut at the first newline after ``chunk_bytes`` that is not
+    inside a quoted field. Ranges start on a record boundary, where no
+    quote is open, so a newline ends a record when the range holds an even
+    number of quote characters before it.
+    """
+    with open(filename, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if not size:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            while start < size:
+                end = size
+                position = start + chunk_bytes
+                quoted = data[start:position].count(b'"') % 2 if position < size else 0
+                while position < size:
+                    newline = data.find(b"\n", position)
+                    if newline < 0:
+                        break
+                    quoted ^= data[position:newline].count(b'"') % 2
+                    if not quoted:
+                        end = newline + 1
+                        break
+                    position = newline + 1
+                yield start, end
+                start = end
+
+
+def parse_parallel(filename, workers, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Yield (rows, rejects, rows_read) per chunk of the file, in file order.
+
+    ``rows`` are validated (name, phone, group, phone_canonical) tuples and
+    ``rejects`` are (line number, row, reason). At most two chunks per
+    worker are in flight, which bounds memory however far the caller falls
+    behind.
+    """
+    # Imported here: concurrent.futures.process is slow to import and only
+    # parallel imports need it.
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        lines = 0
+        for start, end in record_ranges(filename, chunk_bytes):
+            pending.append(pool.submit(_parse_range, filename, start, end))
+            if len(pending) >= 2 * workers:
+                lines = yield from _emit(pending.popleft(), lines)
+        while pending:
+            lines = yield from _emit(pending.popleft(), lines)
+
+
+def _emit(future, lines):
+    # Shifts chunk-local line numbers by the lines in the chunks before it.
+    rows, rejects, rows_read, chunk_lines = future.result()
+    yield rows, [(lines + line_number, row, reason) for line_number, row, reason in rejects], rows_read
+    return lines + chunk_lines
+
+
+def _parse_range(filename, start, end):
+    # Runs in a worker process.
+    with open(filename, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start)
+    text = data.decode("utf-8-sig" if start == 0 else "utf-8")
+    reader = csv.reader(io.StringIO(text, newline=""))
+    rows, rejects, rows_read = [], [], 0
+    for row in reader:
+        if not row or (start == 0 and reader.line_num == 1 and _is_header(row)):
+            continue
+        rows_read += 1
+        try:
+            rows.append(_prepare(row))
+        except ValueError as e:
+            rejects.append((reader.line_num, row, str(e)))
+    return rows, rejects, rows_read, reader.line_num
+
+
+def _write_batch(db, batch, mode, key, report):
+    with db.transaction() as conn:
+        if mode == "replace" and not report.inserted:
+            # The first valid rows of a replace: clear the table in the same transaction.
+            conn.execute("DELETE FROM contacts")
+        if mode != "upsert":
+            conn.executemany(_INSERT, batch)
+            report.inserted += len(batch)
+            return
+
+        # Phones match by canonical form, so "(123) 456-7890" updates "123-456-7890".
+        column = "name" if key == "name" else "phone_canonical"
+        # Later rows in the same batch win, as they would if written one by one.
+        by_key, unkeyed = {}, []
+        for row in batch:
+            k = row[0] if key == "name" else row[3]
+            if k is None:
+                # A phone without digits matches nothing.
+                unkeyed.append(row)
+            else:
+                by_key[k] = row
+        existing = set()
+        keys = list(by_key)
+        for i in range(0, len(keys), _LOOKUP_CHUNK):
+            chunk = keys[i:i + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            existing.update(r[0] for r in conn.execute(
+                f"SELECT {column} FROM contacts WHERE {column} IN ({placeholders})", chunk))
+
+        updates = [(k, row) for k, row in by_key.items() if k in existing]
+        inserts = unkeyed + [row for k, row in by_key.items() if k not in existing]
+        if key == "name":
+            conn.executemany("UPDATE contacts SET phone=?, phone_canonical=?, group_name=? WHERE name=?",
+                             [(phone, canonical, group, name) for _, (name, phone, group, canonical) in updates])
+        else:
+            conn.executemany("UPDATE contacts SET name=?, phone=?, group_name=? WHERE phone_canonical=?",
+                             [(name, phone, group, k) for k, (name, phone, group, _) in updates])
+        conn.executemany(_INSERT, inserts)
+        # Duplicate keys folded within the batch count as updates too.
+        report.updated += len(batch) - len(inserts)
+        report.inserted += len(inserts)
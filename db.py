@@ -0,0 +1,202 @@
+import random
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+
+# Applied to every new connection. WAL lets readers run alongside a writer and,
+# together with synchronous=NORMAL, turns each commit into an append to the WAL
+# instead of an fsync of the main database file.
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("temp_store", "MEMORY"),
+    ("cache_size", -8000),
+    ("busy_timeout", 5000),
+)
+
+# Primary result codes of "database is locked" and "database table is locked".
+_SQLITE_BUSY = 5
+_SQLITE_LOCKED = 6
+
+
+def is_busy(error):
+    """Whether ``error`` means another connection holds a lock that may soon be released."""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (_SQLITE_BUSY, _SQLITE_LOCKED)
+    return "locked" in str(error) or "busy" in str(error)
+
+
+class RetryPolicy:
+    """How often, and how far apart, to retry taking or committing a write lock.
+
+    SQLite already waits up to busy_timeout for the lock; this covers the
+    waits it gives up on, such as a writer in another process holding the
+    lock longer than that. Delays grow by ``multiplier`` from
+    ``initial_delay`` up to ``max_delay``, each shortened by a random
+    fraction up to ``jitter`` so that contending writers spread out.
+    """
+
+    def __init__(self, attempts=5, initial_delay=0.01, max_delay=1.0, multiplier=2.0, jitter=0.5):
+        self.attempts = attempts
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+    def delays(self):
+        delay = self.initial_delay
+        for _ in range(self.attempts - 1):
+            yield delay * (1 - random.random() * self.jitter)
+            delay = min(delay * self.multiplier, self.max_delay)
+
+    def run(self, func, on_retry=None):
+        """Return func(), calling it again after each delay while it fails with a busy error."""
+        for delay in self.delays():
+            try:
+                return func()
+            except sqlite3.OperationalError as e:
+                if not is_busy(e):
+                    raise
+            if on_retry is not None:
+                on_retry()
+            time.sleep(delay)
+        return func()
+
+
+DEFAULT_RETRY = RetryPolicy()
+NO_RETRY = RetryPolicy(attempts=1)
+
+
+class _ThreadConnection:
+    # Lives in one thread's threading.local, so it is freed when the thread
+    # exits, and its finalizer then closes the connection.
+    def __init__(self, conn):
+        self.conn = conn
+        self.close = weakref.finalize(self, conn.close)
+
+
+class ConnectionManager:
+    """Keeps one long-lived SQLite connection per thread for a database file.
+
+    A thread's connection is closed when the thread exits, or by close().
+
+    Transactions that find the database locked by another connection or
+    process are retried according to ``retry``, a RetryPolicy.
+    With an Instrumentation, every statement run on these connections is
+    timed and counted there.
+    """
+
+    def __init__(self, db_file, pragmas=PRAGMAS, instrumentation=None, busy_timeout_ms=None, retry=DEFAULT_RETRY):
+        self.db_file = db_file
+        self.pragmas = pragmas if busy_timeout_ms is None else tuple(pragmas) + (("busy_timeout", busy_timeout_ms),)
+        self.instrumentation = instrumentation
+        # Applied to BEGIN IMMEDIATE and COMMIT of outermost transactions.
+        self.retry = retry
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # The _ThreadConnection of every thread with an open connection.
+        self._connections = weakref.WeakSet()
+        self._generation = 0
+        # Bumped whenever a transaction or savepoint ends, committed or not,
+        # so caches can tell that anything read before it may be out of date.
+        self.write_generation = 0
+
+    def connect(self):
+        local = self._local
+        if getattr(local, "generation", None) != self._generation:
+            local.owner = self._open()
+            local.conn = local.owner.conn
+            local.generation = self._generation
+            local.depth = 0
+        return local.conn
+
+    def _open(self):
+        # Connections may be closed from another thread by close(), so the
+        # same-thread check is disabled; each connection is still only used
+        # by the thread that opened it.
+        if self.instrumentation is None:
+            conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        else:
+            # Imported here: instrumentation pulls in cProfile and logging, which
+            # uninstrumented launches never need.
+            from instrumentation import InstrumentedConnection
+            conn = sqlite3.connect(self.db_file, check_same_thread=False, factory=InstrumentedConnection)
+            conn.instrumentation = self.instrumentation
+            self.instrumentation.count("connections_opened")
+        for name, value in self.pragmas:
+            conn.execute(f"PRAGMA {name}={value}")
+        owner = _ThreadConnection(conn)
+        with self._lock:
+            self._connections.add(owner)
+        return owner
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed statements in one transaction on this thread's connection.
+
+        The outermost block takes the write lock up front and commits on exit;
+        nested blocks become savepoints so they can roll back on their own.
+        """
+        conn = self.connect()
+        local = self._local
+        depth = local.depth
+        savepoint = f"sp{depth}"
+        if depth == 0:
+            self.retry.run(lambda: conn.execute("BEGIN IMMEDIATE"), self._count_retry)
+        else:
+            conn.execute(f"SAVEPOINT {savepoint}")
+        local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            if depth == 0:
+                conn.rollback()
+            else:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            raise
+        else:
+            if depth == 0:
+                try:
+                    # Only a rollback journal needs more locks to commit;
+                    # in WAL mode this never waits.
+                    self.retry.run(conn.commit, self._count_retry)
+                except BaseException:
+                    conn.rollback()
+                    raise
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+        finally:
+            local.depth = depth
+            self._bump_write_generation()
+
+    def _count_retry(self):
+        if self.instrumentation is not None:
+            self.instrumentation.count("busy_retries")
+
+    def in_transaction(self):
+        """Whether the calling thread is inside a transaction() block."""
+        return getattr(self._local, "depth", 0) > 0
+
+    def _bump_write_generation(self):
+        with self._lock:
+            self.write_generation += 1
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = list(self._connections), weakref.WeakSet()
+            self._generation += 1
+        for owner in connections:
+            owner.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
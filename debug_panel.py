@@ -0,0 +1,53 @@
+from PyQt6.QtCore import QTimer
+from PyQt6.QtGui import QFontDatabase
+from PyQt6.QtWidgets import QDockWidget, QHBoxLayout, QLabel, QPlainTextEdit, QPushButton, QVBoxLayout, QWidget
+
+REFRESH_MS = 1000
+
+
+class DiagnosticsPanel(QDockWidget):
+    """Dock showing Instrumentation.report(), refreshed while it is visible.
+
+    ``status_label`` is a one-line summary meant for the status bar; it is
+    refreshed even while the dock is hidden.
+    """
+
+    def __init__(self, instrumentation, parent=None):
+        super().__init__("Diagnostics", parent)
+        self.instrumentation = instrumentation
+        self.setObjectName("diagnostics")
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.text.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self.reset)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        buttons.addWidget(reset_btn)
+        layout = QVBoxLayout()
+        layout.addWidget(self.text)
+        layout.addLayout(buttons)
+        body = QWidget()
+        body.setLayout(layout)
+        self.setWidget(body)
+
+        self.status_label = QLabel()
+        self.timer = QTimer(self)
+        self.timer.setInterval(REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+        self.refresh()
+
+    def refresh(self):
+        self.status_label.setText(self.instrumentation.summary())
+        if self.isVisible():
+            scroll = self.text.verticalScrollBar().value()
+            self.text.setPlainText(self.instrumentation.report())
+            self.text.verticalScrollBar().setValue(scroll)
+
+    def reset(self):
+        self.instrumentation.reset()
+        self.refresh()
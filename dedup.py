@@ -0,0 +1,119 @@
+"""Duplicate detection over the contacts table.
+
+Contacts are linked when they share a canonical phone, an email address
+or a near-identical name, and find_duplicates returns the connected
+groups. Phones and emails are grouped in one ordered pass each. Names are
+compared by sorted neighbourhood: contacts are sorted on a blocking key
+(the words of the name, lower-cased and sorted) and each is compared only
+with the next ``window`` contacts, once in key order and once in reversed
+key order so that a typo early in the key still lands near its twin. The
+whole pass is O(n log n) rather than pairwise.
+"""
+from collections import deque
+
+from fuzzy import bigrams, osa_distance, words
+
+DUPLICATE_RULES = ("phone", "email", "name")
+NAME_WINDOW = 4
+NAME_SIMILARITY = 0.85
+
+
+class DuplicateGroup:
+    """Ids of contacts linked as duplicates, and the rules that linked them."""
+
+    def __init__(self, ids, reasons):
+        self.ids = ids
+        self.reasons = reasons
+
+    def __repr__(self):
+        return f"DuplicateGroup(ids={self.ids!r}, reasons={sorted(self.reasons)!r})"
+
+
+class _Links:
+    # Union-find over contact ids, with path halving.
+
+    def __init__(self):
+        self._parent = {}
+        self._reasons = {}
+
+    def _root(self, contact_id):
+        parent = self._parent
+        while parent.get(contact_id, contact_id) != contact_id:
+            grandparent = parent.get(parent[contact_id], parent[contact_id])
+            parent[contact_id] = grandparent
+            contact_id = grandparent
+        return contact_id
+
+    def link(self, a, b, reason):
+        a, b = self._root(a), self._root(b)
+        if a != b:
+            if b < a:
+                a, b = b, a
+            self._parent[b] = a
+            self._parent.setdefault(a, a)
+            self._reasons.setdefault(a, set()).update(self._reasons.pop(b, ()))
+        self._reasons.setdefault(a, set()).add(reason)
+
+    def groups(self):
+        members = {}
+        for contact_id in self._parent:
+            members.setdefault(self._root(contact_id), []).append(contact_id)
+        return [DuplicateGroup(sorted(ids), self._reasons[root])
+                for root, ids in sorted(members.items()) if len(ids) > 1]
+
+
+def find_duplicates(conn, rules=DUPLICATE_RULES, name_similarity=NAME_SIMILARITY, window=NAME_WINDOW):
+    """Return DuplicateGroups of contacts linked by any of ``rules``, lowest id first.
+
+    Two names are linked when their blocking keys are within
+    ``1 - name_similarity`` of their length in edits.
+    """
+    unknown = set(rules) - set(DUPLICATE_RULES)
+    if unknown:
+        raise ValueError(f"rules must be drawn from {DUPLICATE_RULES}, not {sorted(unknown)}")
+    links = _Links()
+    if "phone" in rules:
+        _link_equal(links, conn.execute(
+            "SELECT phone_canonical, id FROM contacts WHERE phone_canonical IS NOT NULL ORDER BY 1"), "phone")
+    if "email" in rules:
+        _link_equal(links, conn.execute(
+            "SELECT lower(trim(email)), id FROM contacts WHERE trim(email) <> '' ORDER BY 1"), "email")
+    if "name" in rules:
+        keyed = [(" ".join(sorted(words(name or ""))), contact_id)
+                 for contact_id, name in conn.execute("SELECT id, name FROM contacts")]
+        keyed.sort()
+        _link_neighbours(links, keyed, name_similarity, window)
+        keyed = [(key[::-1], contact_id) for key, contact_id in keyed]
+        keyed.sort()
+        _link_neighbours(links, keyed, name_similarity, window)
+    return links.groups()
+
+
+def _link_equal(links, rows, reason):
+    # ``rows`` are (key, id) ordered by key; every run of equal keys is linked.
+    previous_key = first = None
+    for key, contact_id in rows:
+        if key == previous_key:
+            links.link(first, contact_id, reason)
+        else:
+            previous_key, first = key, contact_id
+
+
+def _link_neighbours(links, keyed, similarity, window):
+    # Each key is compared with the ``window`` keys before it. Keys k edits
+    # apart share all but 3k of their bigrams, which rules out most
+    # neighbours before any edit distance is computed.
+    recent = deque(maxlen=window)
+    for key, contact_id in keyed:
+        if not key:
+            continue
+        grams = bigrams(key)
+        for other_key, other_id, other_grams in recent:
+            if other_key == key:
+                links.link(other_id, contact_id, "name")
+                continue
+            bound = int(max(len(key), len(other_key)) * (1 - similarity))
+            if (bound and len(grams & other_grams) >= max(len(grams), len(other_grams)) - 3 * bound
+                    and osa_distance(key, other_key, bound) <= bound):
+                links.link(other_id, contact_id, "name")
+        recent.append((key, contact_id, grams))
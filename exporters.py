@@ -0,0 +1,150 @@
+import csv
+import gzip
+import json
+
+from search import match_clause
+
+DEFAULT_FETCH_SIZE = 1000
+
+# Columns read from the contacts table, and the names writers use for them.
+# email and notes come last so a CSV export still imports as name,phone,group.
+EXPORT_COLUMNS = ("name", "phone", "group_name", "email", "notes")
+EXPORT_FIELDS = ("name", "phone", "group", "email", "notes")
+
+
+class CSVWriter:
+    extension = ".csv"
+
+    def __init__(self, file):
+        self._writer = csv.writer(file)
+
+    def write_rows(self, rows):
+        self._writer.writerows(rows)
+
+
+class JSONLinesWriter:
+    extension = ".jsonl"
+
+    def __init__(self, file):
+        self._file = file
+
+    def write_rows(self, rows):
+        self._file.writelines(
+            json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + "\n" for row in rows)
+
+
+class VCardWriter:
+    """Writes vCard 3.0 (RFC 2426) entries, one per contact."""
+
+    extension = ".vcf"
+
+    def __init__(self, file):
+        self._file = file
+
+    def write_rows(self, rows):
+        for name, phone, group, email, notes in rows:
+            name = name or ""
+            given, _, family = name.rpartition(" ")
+            lines = [
+                "BEGIN:VCARD",
+                "VERSION:3.0",
+                f"FN:{_vcard_escape(name)}",
+                f"N:{_vcard_escape(family)};{_vcard_escape(given)};;;",
+            ]
+            if phone:
+                lines.append(f"TEL;TYPE=VOICE:{_vcard_escape(phone)}")
+            if email:
+                lines.append(f"EMAIL;TYPE=INTERNET:{_vcard_escape(email)}")
+            if group:
+                lines.append(f"CATEGORIES:{_vcard_escape(group)}")
+            if notes:
+                lines.append(f"NOTE:{_vcard_escape(notes)}")
+            lines.append("END:VCARD")
+            self._file.write("".join(_vcard_fold(line) + "\r\n" for line in lines))
+
+
+WRITERS = {
+    "csv": CSVWriter,
+    "jsonl": JSONLinesWriter,
+    "vcf": VCardWriter,
+}
+
+
+def _vcard_escape(value):
+    return (value.replace("\\", "\\\\").replace(",", "\\,").replace(";", "\\;")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _vcard_fold(line, limit=75):
+    # Continuation lines start with a single space, which counts toward the limit.
+    if len(line.encode("utf-8")) <= limit:
+        return line
+    parts = []
+    current = ""
+    for char in line:
+        width = limit if not parts else limit - 1
+        if len((current + char).encode("utf-8")) > width:
+            parts.append(current)
+            current = char
+        else:
+            current += char
+    parts.append(current)
+    return "\r\n ".join(parts)
+
+
+def detect_format(filename):
+    name = filename.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    for fmt, writer in WRITERS.items():
+        if name.endswith(writer.extension):
+            return fmt
+    return "csv"
+
+
+def export_contacts(db, filename, fmt=None, compress=None, group=None, term=None, fts=False, phone_index=False,
+                    fetch_size=DEFAULT_FETCH_SIZE):
+    """Stream contacts into ``filename`` and return how many were written.
+
+    ``fmt`` is one of WRITERS and ``compress`` toggles gzip; both default to
+    what the file name suggests. ``group`` keeps one group and ``term`` keeps
+    contacts matching it the way search_contact does, through the FTS index
+    when ``fts`` is set and the phone digits index with ``phone_index``.
+    Rows are pulled from the cursor ``fetch_size`` at a time, so memory
+    does not grow with the table.
+    """
+    fmt = fmt or detect_format(filename)
+    if fmt not in WRITERS:
+        raise ValueError(f"fmt must be one of {tuple(WRITERS)}, not {fmt!r}")
+    if compress is None:
+        compress = filename.lower().endswith(".gz")
+
+    sql = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM contacts"
+    clauses, params = [], []
+    if group is not None:
+        # '' selects contacts without a group, as in the repository and group_counts().
+        clauses.append("(group_name = ? OR group_name IS NULL)" if group == "" else "group_name = ?")
+        params.append(group)
+    if term:
+        where, where_params = match_clause(term, fts, phone_index)
+        clauses.append(where)
+        params.extend(where_params)
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY id"
+
+    opener = gzip.open if compress else open
+    written = 0
+    with opener(filename, "wt", newline="", encoding="utf-8") as file:
+        writer = WRITERS[fmt](file)
+        cursor = db.connect().execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                writer.write_rows(rows)
+                written += len(rows)
+        finally:
+            cursor.close()
+    return written
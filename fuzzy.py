@@ -0,0 +1,260 @@
+"""Typo-tolerant word matching behind ContactIndex.fuzzy and NameIndex.
+
+Names are split into lower-case words. For a query word, candidate words
+come from a bigram prefilter: a word within k edits of it shares all but
+at most 3k of its padded bigrams (an edit touches two bigrams, an adjacent
+transposition three), and differs in length by at most k. Only the
+candidates that pass pay for an edit-distance computation.
+"""
+import heapq
+import re
+import sys
+from array import array
+from bisect import bisect_left, insort
+
+_WORD = re.compile(r"\w+")
+
+
+def words(text):
+    return _WORD.findall(text.lower())
+
+
+def max_edits(word):
+    """Edits tolerated in a query word: none up to two letters, one up to five, then two."""
+    length = len(word)
+    return 0 if length <= 2 else 1 if length <= 5 else 2
+
+
+def osa_distance(a, b, bound):
+    """Edit distance counting adjacent transpositions as one edit, capped at ``bound + 1``.
+
+    Hyyro's bit-parallel form of the dynamic program: a column of the
+    table is kept as bit vectors of +1/-1 steps, one bit per letter of
+    ``a``, so each letter of ``b`` costs a handful of integer operations
+    instead of a row of comparisons.
+    """
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    if a == b:
+        return 0
+    if not a or not b:
+        return min(len(a) + len(b), bound + 1)
+    masks = {}
+    bit = 1
+    for char in a:
+        masks[char] = masks.get(char, 0) | bit
+        bit <<= 1
+    full = bit - 1
+    last = bit >> 1
+    vp, vn, d0, previous = full, 0, 0, 0
+    distance = len(a)
+    for char in b:
+        pm = masks.get(char, 0)
+        # Diagonal steps that an adjacent transposition makes free.
+        transposed = (((~d0) & pm) << 1) & previous
+        d0 = ((((pm & vp) + vp) & full) ^ vp) | pm | vn | transposed
+        hp = vn | ~(d0 | vp) & full
+        hn = d0 & vp
+        if hp & last:
+            distance += 1
+        elif hn & last:
+            distance -= 1
+        hp = ((hp << 1) | 1) & full
+        hn = (hn << 1) & full
+        vp = hn | ~(d0 | hp) & full
+        vn = d0 & hp
+        previous = pm
+    return min(distance, bound + 1)
+
+
+def bigrams(word):
+    padded = f"^{word}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+class WordIndex:
+    """Vocabulary of name words and the contacts using each word.
+
+    The id lists only grow; callers verify hits against the current name
+    and rebuild the index to drop stale ids and unused words.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        # (bigram, word length) -> words, so the prefilter only visits
+        # words whose length is within reach.
+        self._grams = {}
+        self._sorted = []
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, contact_id, name):
+        for word in set(words(name)):
+            ids = self._ids.get(word)
+            if ids is None:
+                ids = self._ids[word] = array("q")
+                self._add_grams(word)
+                insort(self._sorted, word)
+            ids.append(contact_id)
+
+    def add_many(self, rows):
+        """Add (id, name) rows, sorting the new words in once."""
+        new_words = []
+        for contact_id, name in rows:
+            for word in set(words(name)):
+                ids = self._ids.get(word)
+                if ids is None:
+                    ids = self._ids[word] = array("q")
+                    self._add_grams(word)
+                    new_words.append(word)
+                ids.append(contact_id)
+        if new_words:
+            self._sorted = sorted(self._sorted + new_words)
+
+    def ids(self, word):
+        return self._ids.get(word, ())
+
+    def similar(self, word, prefix=False):
+        """Map vocabulary words close to ``word`` to a similarity in (0, 1].
+
+        Words within max_edits(word) edits score 1 - edits / length. With
+        ``prefix``, words that ``word`` starts (from two letters on) also
+        match, scoring the share of the word typed so far.
+        """
+        bound = max_edits(word)
+        found = {word: 1.0} if word in self._ids else {}
+        if bound:
+            needed = max(1, len(word) + 1 - 3 * bound)
+            grams = bigrams(word)
+            shared = {}
+            for length in range(len(word) - bound, len(word) + bound + 1):
+                for gram in grams:
+                    for candidate in self._grams.get((gram, length), ()):
+                        shared[candidate] = shared.get(candidate, 0) + 1
+            for candidate, count in shared.items():
+                if count >= needed and candidate not in found:
+                    distance = osa_distance(word, candidate, bound)
+                    if distance <= bound:
+                        found[candidate] = 1 - distance / max(len(word), len(candidate))
+        if prefix and len(word) >= 2:
+            start = bisect_left(self._sorted, word)
+            end = bisect_left(self._sorted, word + "\U0010ffff", start)
+            for candidate in self._sorted[start:end]:
+                score = len(word) / len(candidate)
+                if score > found.get(candidate, 0.0):
+                    found[candidate] = score
+        return found
+
+    def memory_usage(self):
+        return (sys.getsizeof(self._ids) + sys.getsizeof(self._grams) + sys.getsizeof(self._sorted)
+                + sum(sys.getsizeof(word) + sys.getsizeof(ids) for word, ids in self._ids.items())
+                + sum(sys.getsizeof(key) + sys.getsizeof(group) for key, group in self._grams.items()))
+
+    def _add_grams(self, word):
+        length = len(word)
+        for gram in bigrams(word):
+            self._grams.setdefault((gram, length), []).append(word)
+
+
+def best_matches(word_index, name_of, term, limit):
+    """Ids of the ``limit`` contacts whose names best match ``term`` despite typos, best first.
+
+    Each word of ``term`` scores against the closest word of the name, as
+    WordIndex.similar rates it, with the last word also matching as a
+    prefix. A contact scores the sum over the query words; ties go to the
+    lower id. ``name_of(contact_id)`` is the contact's current name, or
+    None if it is gone.
+    """
+    query = words(term)
+    if not query:
+        return []
+    similar = [word_index.similar(word, prefix=i == len(query) - 1) for i, word in enumerate(query)]
+    scores = None
+    for close in similar:
+        # Lower scores first, so each contact ends up with its best word's.
+        best = {}
+        for word, score in sorted(close.items(), key=lambda item: item[1]):
+            best.update(dict.fromkeys(word_index.ids(word), score))
+        if scores is None:
+            scores = best
+            continue
+        for contact_id, score in best.items():
+            scores[contact_id] = scores.get(contact_id, 0.0) + score
+
+    # Scores from the postings can only overstate a contact (stale ids of
+    # renamed contacts), so pop the best, re-score it from its current
+    # name and keep it only if it still holds its place.
+    heap = [(-score, contact_id) for contact_id, score in scores.items()]
+    heapq.heapify(heap)
+    ids = []
+    while heap and len(ids) < limit:
+        score, contact_id = heapq.heappop(heap)
+        name = name_of(contact_id)
+        if name is None:
+            continue
+        name_words = set(words(name))
+        actual = sum(max((close.get(word, 0.0) for word in name_words), default=0.0) for close in similar)
+        if actual >= -score - 1e-9:
+            ids.append(contact_id)
+        elif actual > 0:
+            heapq.heappush(heap, (-actual, contact_id))
+    return ids
+
+
+class NameIndex:
+    """Contact names and their WordIndex: all that fuzzy lookups need.
+
+    AddressBook.fuzzy_search uses one when no ContactIndex is enabled, so
+    fuzzy lookups never change how search_contact answers. It takes the
+    same (id, name, phone) rows and edits as ContactIndex, ignoring the
+    phones, so writes patch either in place. Like ContactIndex, the word
+    lists only grow and are rebuilt once half their ids are stale.
+    """
+
+    def __init__(self):
+        self._names = {}
+        self._words = WordIndex()
+        self._stale = 0
+
+    def __len__(self):
+        return len(self._names)
+
+    def build(self, rows):
+        """Replace the contents with (id, name, phone) rows."""
+        self._names = {contact_id: name or "" for contact_id, name, _ in rows}
+        self._rebuild_words()
+
+    def add(self, contact_id, name, phone=None):
+        name = name or ""
+        self._names[contact_id] = name
+        self._words.add(contact_id, name)
+
+    def add_many(self, rows):
+        """Add (id, name, phone) rows."""
+        rows = [(contact_id, name or "") for contact_id, name, _ in rows]
+        self._names.update(rows)
+        self._words.add_many(rows)
+
+    def update(self, contact_id, name, phone=None):
+        self.remove(contact_id)
+        self.add(contact_id, name)
+
+    def remove(self, contact_id):
+        if self._names.pop(contact_id, None) is None:
+            return
+        self._stale += 1
+        if self._stale * 2 > len(self._names):
+            self._rebuild_words()
+
+    def fuzzy(self, term, limit=10):
+        return best_matches(self._words, self._names.get, term, limit)
+
+    def memory_usage(self):
+        return (sys.getsizeof(self._names) + sum(map(sys.getsizeof, self._names.values()))
+                + self._words.memory_usage())
+
+    def _rebuild_words(self):
+        self._words = WordIndex()
+        self._words.add_many(self._names.items())
+        self._stale = 0
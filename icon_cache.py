@@ -0,0 +1,42 @@
+"""Button icons, resized once and kept in the user's cache directory.
+
+The PNGs under icons/ are 512x512; the GUIs show them at 24x24. Resizing
+them with Pillow on every launch costs more than the rest of the window,
+so icon_path() writes each size once and later launches load the small
+file directly (tkinter's PhotoImage reads PNG without Pillow). A cached
+file older than its source is regenerated.
+"""
+import os
+import tempfile
+
+ICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "icons")
+
+
+def cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "address_book", "icons")
+
+
+def icon_path(name, size):
+    """Return the path of icons/<name>.png resized to ``size`` x ``size``, creating it if needed."""
+    source = os.path.join(ICON_DIR, f"{name}.png")
+    cached = os.path.join(cache_dir(), f"{name}-{size}.png")
+    try:
+        if os.path.getmtime(cached) >= os.path.getmtime(source):
+            return cached
+    except OSError:
+        pass
+    from PIL import Image
+    os.makedirs(os.path.dirname(cached), exist_ok=True)
+    with Image.open(source) as image:
+        resized = image.resize((size, size), Image.LANCZOS)
+    # Written beside the target and renamed, so a concurrent launch never reads half a file.
+    fd, tmp = tempfile.mkstemp(suffix=".png", dir=os.path.dirname(cached))
+    try:
+        with os.fdopen(fd, "wb") as file:
+            resized.save(file, "PNG")
+        os.replace(tmp, cached)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return cached
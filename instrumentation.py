@@ -0,0 +1,308 @@
+"""Opt-in timing of every SQL statement, and profiling hooks for UI refreshes.
+
+Handing an Instrumentation to ConnectionManager makes it open
+InstrumentedConnections. Each statement is timed from execute() until
+its cursor is exhausted, closed or dropped, so the time spent fetching
+rows counts too, and is recorded with its SQL, parameter count and row
+count. Statements are aggregated by SQL text, with runs of "?, ?, ..."
+collapsed so that IN lists of any length share one entry.
+
+Without an Instrumentation, connections are plain sqlite3 connections
+and none of this costs anything.
+"""
+import cProfile
+import io
+import logging
+import pstats
+import re
+import sqlite3
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("address_book.sql")
+
+# Slow queries and captures kept for inspection; older ones are dropped.
+RECENT_SLOW_QUERIES = 50
+RECENT_CAPTURES = 20
+
+# Functions listed per cProfile capture, by cumulative time.
+PROFILE_LINES = 25
+
+_PLACEHOLDERS = re.compile(r"\?(?:\s*,\s*\?)+")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    return _PLACEHOLDERS.sub("?, ...", _SPACE.sub(" ", sql).strip())
+
+
+class QueryStats:
+    __slots__ = ("calls", "seconds", "max_seconds", "rows", "params")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.params = 0
+
+
+class Instrumentation:
+    """Query timings, connection and commit counters, and captures of UI refreshes.
+
+    Statements taking ``slow_query_ms`` or longer are logged as warnings on
+    the "address_book.sql" logger and kept in ``slow_queries``. capture()
+    times a block of code and the SQL it ran; with ``profile`` it also
+    records a cProfile listing, and with ``trace_memory`` the tracemalloc
+    peak. Safe to share between threads.
+    """
+
+    def __init__(self, slow_query_ms=None, profile=False, trace_memory=False):
+        self.slow_query_ms = slow_query_ms
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.queries = {}
+            self.connections_opened = 0
+            self.commits = 0
+            self.rollbacks = 0
+            self.busy_retries = 0
+            self.query_count = 0
+            self.query_seconds = 0.0
+            self.slow_queries = deque(maxlen=RECENT_SLOW_QUERIES)
+            self.captures = deque(maxlen=RECENT_CAPTURES)
+
+    def record(self, sql, params, rows, seconds):
+        key = normalize_sql(sql)
+        with self._lock:
+            stats = self.queries.get(key)
+            if stats is None:
+                stats = self.queries[key] = QueryStats()
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.rows += rows
+            stats.params += params
+            self.query_count += 1
+            self.query_seconds += seconds
+            slow = self.slow_query_ms is not None and seconds * 1000 >= self.slow_query_ms
+            if slow:
+                self.slow_queries.append(dict(at=time.time(), sql=key, params=params, rows=rows, seconds=seconds))
+        if slow:
+            logger.warning("slow query: %.1f ms, %d params, %d rows: %s", seconds * 1000, params, rows, key)
+
+    def count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @contextmanager
+    def capture(self, name):
+        """Record how long the enclosed block takes and the SQL it runs, as ``name``.
+
+        Captures may nest; only the outermost one on a thread profiles and
+        traces memory, since both are process-wide.
+        """
+        with self._lock:
+            queries, query_seconds = self.query_count, self.query_seconds
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        profiler = cProfile.Profile() if self.profile and depth == 0 else None
+        trace_memory = self.trace_memory and depth == 0
+        started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        elif trace_memory and hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            seconds = time.perf_counter() - start
+            self._local.depth = depth
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+            if started_tracing:
+                tracemalloc.stop()
+            profile = None
+            if profiler is not None:
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+                profile = out.getvalue()
+            with self._lock:
+                self.captures.append(dict(
+                    name=name, at=time.time(), seconds=seconds, queries=self.query_count - queries,
+                    query_seconds=self.query_seconds - query_seconds, peak_bytes=peak, profile=profile))
+
+    def snapshot(self):
+        """Return the counters, per-statement totals (slowest first), slow queries and captures."""
+        with self._lock:
+            queries = [dict(sql=sql, calls=stats.calls, seconds=stats.seconds, max_seconds=stats.max_seconds,
+                            rows=stats.rows, params=stats.params)
+                       for sql, stats in self.queries.items()]
+            snapshot = dict(
+                connections_opened=self.connections_opened, commits=self.commits, rollbacks=self.rollbacks,
+                busy_retries=self.busy_retries, query_count=self.query_count, query_seconds=self.query_seconds,
+                slow_queries=list(self.slow_queries), captures=list(self.captures))
+        snapshot["queries"] = sorted(queries, key=lambda query: query["seconds"], reverse=True)
+        return snapshot
+
+    def summary(self):
+        return (f"{self.query_count} queries, {self.query_seconds * 1000:,.0f} ms SQL, "
+                f"{self.commits} commits, {self.busy_retries} busy retries, {self.connections_opened} connections")
+
+    def report(self, limit=10):
+        """A plain-text rendering of snapshot(), for logs and the debug panel."""
+        snapshot = self.snapshot()
+        lines = [self.summary(), "", "Slowest statements by total time:"]
+        for query in snapshot["queries"][:limit]:
+            lines.append(f"{query['seconds'] * 1000:>9.1f} ms {query['calls']:>7} calls "
+                         f"{query['max_seconds'] * 1000:>8.1f} ms max {query['rows']:>9} rows  {query['sql']}")
+        if snapshot["slow_queries"]:
+            lines += ["", "Recent slow queries:"]
+            for query in reversed(snapshot["slow_queries"][-limit:]):
+                lines.append(f"{query['seconds'] * 1000:>9.1f} ms {query['params']:>4} params "
+                             f"{query['rows']:>7} rows  {query['sql']}")
+        if snapshot["captures"]:
+            lines += ["", "Recent captures:"]
+            for capture in reversed(snapshot["captures"][-limit:]):
+                peak = f", peak {capture['peak_bytes'] / 1e6:,.1f} MB" if capture["peak_bytes"] is not None else ""
+                lines.append(f"{capture['seconds'] * 1000:>9.1f} ms  {capture['name']}: {capture['queries']} queries, "
+                             f"{capture['query_seconds'] * 1000:,.1f} ms SQL{peak}")
+            latest = next((capture for capture in reversed(snapshot["captures"]) if capture["profile"]), None)
+            if latest is not None:
+                lines += ["", f"Profile of the latest {latest['name']}:", latest["profile"]]
+        return "\n".join(lines)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    def __init__(self, connection):
+        super().__init__(connection)
+        self._instrumentation = connection.instrumentation
+        self._sql = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._begin(sql, len(parameters), time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        counted = [0]
+
+        def counting(seq):
+            for parameters in seq:
+                counted[0] += len(parameters)
+                yield parameters
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, counting(seq_of_parameters))
+        finally:
+            self._begin(sql, counted[0], time.perf_counter() - start)
+            self._finish()
+
+    def executescript(self, sql_script):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._begin(sql_script, 0, time.perf_counter() - start)
+            self._finish()
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(row is not None, start, done=row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(len(rows), start, done=len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(len(rows), start, done=True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(0, start, done=True)
+            raise
+        self._fetched(1, start)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _begin(self, sql, params, seconds):
+        self._sql = sql
+        self._params = params
+        self._seconds = seconds
+        # rowcount is the rows changed by a write, -1 for a query.
+        self._rows = max(self.rowcount, 0)
+        if self.description is None:
+            self._finish()
+
+    def _fetched(self, rows, start, done=False):
+        if self._sql is None:
+            return
+        self._seconds += time.perf_counter() - start
+        self._rows += rows
+        if done:
+            self._finish()
+
+    def _finish(self):
+        if getattr(self, "_sql", None) is not None:
+            sql, self._sql = self._sql, None
+            self._instrumentation.record(sql, self._params, self._rows, self._seconds)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """A sqlite3 connection whose statements, commits and rollbacks are counted in ``instrumentation``."""
+
+    instrumentation = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        super().commit()
+        self.instrumentation.count("commits")
+
+    def rollback(self):
+        super().rollback()
+        self.instrumentation.count("rollbacks")
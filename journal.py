@@ -0,0 +1,234 @@
+"""Incremental sync through the change journal.
+
+Triggers on the contacts table (see migrations._add_change_journal) append
+(seq, op, contact_id) to the changes table for every insert, update and
+delete, with seq increasing in commit order. A delta is the net change
+since a sequence number: each contact touched since then once, as its
+current row, or as a delete if it is gone. Its cost follows the number of
+contacts changed, not the size of the table.
+
+A delta file is JSON Lines: a header {"since": ..., "seq": ...}, then one
+{"op": "upsert", "id": ..., "name": ..., ...} or {"op": "delete", "id": ...}
+per contact. Applying it to a replica at ``since`` brings it to ``seq``;
+ids are kept, so a replica should only be written through deltas. The
+replica records the ``seq`` it has reached and refuses a delta that would
+leave a gap after it or take it back before it. A replica starts from a
+snapshot of the source restored with backup.restore(replica=True), which
+puts it at the snapshot's ``seq``; so does one that fell behind the
+journal's horizon.
+"""
+import gzip
+import json
+import time
+
+from phones import canonical_phone
+
+DEFAULT_FETCH_SIZE = 1000
+
+# Records applied per batch; also the ids per "IN (...)" lookup, under
+# SQLite's default host parameter limit.
+APPLY_BATCH_SIZE = 500
+
+# Columns of an upsert record, and the names delta files use for them.
+DELTA_COLUMNS = ("id", "name", "phone", "email", "group_name", "notes")
+DELTA_FIELDS = ("id", "name", "phone", "email", "group", "notes")
+
+_NET_CHANGES = f"""
+    SELECT {', '.join(f'contacts.{column}' for column in DELTA_COLUMNS)}, changed.contact_id
+    FROM (SELECT contact_id, max(seq) AS seq FROM changes WHERE seq > ? GROUP BY contact_id) AS changed
+    LEFT JOIN contacts ON contacts.id = changed.contact_id
+    ORDER BY changed.seq"""
+
+_INSERT = ("INSERT INTO contacts (id, name, phone, email, group_name, notes, phone_canonical)"
+           " VALUES (?, ?, ?, ?, ?, ?, ?)")
+_UPDATE = "UPDATE contacts SET name=?, phone=?, email=?, group_name=?, notes=?, phone_canonical=? WHERE id=?"
+
+
+class DeltaReport:
+    def __init__(self, filename, since, seq=None):
+        self.filename = filename
+        self.since = since
+        self.seq = seq
+        self.upserted = 0
+        self.deleted = 0
+        self.elapsed = 0.0
+
+    def __str__(self):
+        return (f"changes {self.since}..{self.seq}: {self.upserted} upserted, {self.deleted} deleted "
+                f"({self.elapsed * 1000:,.0f} ms)")
+
+
+def current_seq(conn):
+    """The sequence number of the latest change, 0 if nothing was ever journaled."""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+    return row[0] if row else 0
+
+
+def horizon(conn):
+    """Changes up to this sequence number have been compacted away."""
+    return conn.execute("SELECT horizon FROM journal_state").fetchone()[0]
+
+
+def applied_seq(conn):
+    """The source sequence number this database has applied deltas up to, 0 if none."""
+    return conn.execute("SELECT applied FROM journal_state").fetchone()[0]
+
+
+def changes_since(conn, since, fetch_size=DEFAULT_FETCH_SIZE):
+    """Yield ("upsert", row) or ("delete", contact_id) for each contact changed after ``since``.
+
+    ``row`` is the contact's current (id, name, phone, email, group_name,
+    notes). Changes come in the order of each contact's latest change.
+    Raises ValueError if the journal no longer reaches back to ``since``.
+    """
+    if since < horizon(conn):
+        raise ValueError(f"the journal starts after {horizon(conn)}; changes since {since} are gone, "
+                         f"so the replica must start again from a snapshot")
+    return _net_changes(conn, since, fetch_size)
+
+
+def _net_changes(conn, since, fetch_size):
+    cursor = conn.execute(_NET_CHANGES, (since,))
+    try:
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                return
+            for row in rows:
+                if row[0] is None:
+                    yield "delete", row[-1]
+                else:
+                    yield "upsert", row[:-1]
+    finally:
+        cursor.close()
+
+
+def export_changes(db, filename, since=0, compress=None):
+    """Write the changes after ``since`` to ``filename`` and return a DeltaReport.
+
+    The report's ``seq`` is where the file brings a replica to: pass it as
+    ``since`` next time. The journal is read in one transaction, so the
+    rows written are those as of ``seq``.
+    """
+    if compress is None:
+        compress = filename.lower().endswith(".gz")
+    report = DeltaReport(filename, since)
+    start = time.perf_counter()
+    conn = db.connect()
+    own_transaction = not conn.in_transaction
+    if own_transaction:
+        conn.execute("BEGIN")
+    try:
+        report.seq = current_seq(conn)
+        changes = changes_since(conn, since)
+        opener = gzip.open if compress else open
+        with opener(filename, "wt", newline="", encoding="utf-8") as file:
+            file.write(json.dumps(dict(since=since, seq=report.seq)) + "\n")
+            for op, change in changes:
+                if op == "delete":
+                    record = dict(op=op, id=change)
+                    report.deleted += 1
+                else:
+                    record = dict(op=op, **dict(zip(DELTA_FIELDS, change)))
+                    report.upserted += 1
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if own_transaction:
+            conn.rollback()
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def apply_changes(db, filename, batch_size=APPLY_BATCH_SIZE):
+    """Apply a delta file written by export_changes() in one transaction; return a DeltaReport.
+
+    Raises ValueError, changing nothing, if the file starts after the
+    sequence number this database has reached (changes in between would be
+    missed) or ends before it (older rows would overwrite newer ones).
+    """
+    opener = gzip.open if filename.lower().endswith(".gz") else open
+    start = time.perf_counter()
+    with opener(filename, "rt", encoding="utf-8") as file, db.transaction() as conn:
+        header = json.loads(file.readline())
+        report = DeltaReport(filename, header["since"], header["seq"])
+        applied = applied_seq(conn)
+        if report.since > applied:
+            raise ValueError(f"delta starts at {report.since} but this replica is at {applied}; "
+                             f"changes in between are missing")
+        if report.seq < applied:
+            raise ValueError(f"delta ends at {report.seq} but this replica is already at {applied}")
+        upserts, deletes = [], []
+        for line in file:
+            record = json.loads(line)
+            if record["op"] == "delete":
+                deletes.append((record["id"],))
+            else:
+                upserts.append(tuple(record.get(field) for field in DELTA_FIELDS)
+                               + (canonical_phone(record.get("phone")),))
+            if len(upserts) + len(deletes) >= batch_size:
+                _apply_batch(conn, upserts, deletes, report)
+                upserts, deletes = [], []
+        _apply_batch(conn, upserts, deletes, report)
+        conn.execute("UPDATE journal_state SET applied = ?", (report.seq,))
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def _apply_batch(conn, upserts, deletes, report):
+    # A delta holds each contact once, so upserts and deletes never conflict.
+    # Existing ids are updated and the rest inserted, rather than with
+    # INSERT ... ON CONFLICT, whose conflict handling would override the
+    # INSERT OR IGNORE in the group_counts triggers.
+    if upserts:
+        ids = [row[0] for row in upserts]
+        existing = {row[0] for row in conn.execute(
+            f"SELECT id FROM contacts WHERE id IN ({','.join('?' * len(ids))})", ids)}
+        conn.executemany(_UPDATE, [row[1:] + row[:1] for row in upserts if row[0] in existing])
+        conn.executemany(_INSERT, [row for row in upserts if row[0] not in existing])
+        report.upserted += len(upserts)
+    if deletes:
+        conn.executemany("DELETE FROM contacts WHERE id = ?", deletes)
+        report.deleted += len(deletes)
+
+
+def restart_journal(db, seq, applied=None):
+    """Start the journal over after the contacts were replaced wholesale, as by a restore.
+
+    The journal that came with the new contents does not lead on from
+    ``seq``, the latest sequence number handed out before, so it is dropped
+    and numbering goes on from past both. That point becomes the horizon:
+    deltas from before it are refused, and replicas start again from a
+    snapshot taken since, restored with ``replica=True``. ``applied``, if
+    given, becomes the applied sequence number. Returns the new sequence
+    number.
+    """
+    with db.transaction() as conn:
+        seq = max(seq, current_seq(conn)) + 1
+        conn.execute("DELETE FROM changes")
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = 'changes'")
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('changes', ?)", (seq,))
+        conn.execute("UPDATE journal_state SET horizon = ?", (seq,))
+        if applied is not None:
+            conn.execute("UPDATE journal_state SET applied = ?", (applied,))
+    return seq
+
+
+def compact_journal(db, before=None):
+    """Shrink the journal and return how many entries were dropped.
+
+    Entries superseded by a later change to the same contact are dropped;
+    deltas do not need them, so this never changes what changes_since()
+    returns. With ``before``, every entry up to that sequence number goes
+    too and deltas from earlier than ``before`` are refused from then on.
+    What is left is at most one entry per contact changed since the horizon.
+    """
+    with db.transaction() as conn:
+        dropped = conn.execute("""DELETE FROM changes WHERE seq < (
+                                      SELECT max(seq) FROM changes AS later
+                                      WHERE later.contact_id = changes.contact_id)""").rowcount
+        if before is not None:
+            before = min(before, current_seq(conn))
+        if before is not None and before > horizon(conn):
+            dropped += conn.execute("DELETE FROM changes WHERE seq <= ?", (before,)).rowcount
+            conn.execute("UPDATE journal_state SET horizon = ?", (before,))
+    return dropped
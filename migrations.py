@@ -0,0 +1,182 @@
+"""Versioned schema upgrades shared by AddressBook and both GUIs.
+
+The schema version lives in ``PRAGMA user_version``. Each entry of
+MIGRATIONS upgrades the database by one version and runs in the same
+transaction that records the new version, so an interrupted upgrade leaves
+the file at the previous version. Opening an up-to-date database costs a
+single header read.
+"""
+from phones import canonical_phone
+from search import ensure_phone_index, ensure_search_index
+
+
+def _create_contacts(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS contacts (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT NOT NULL,
+                        phone TEXT,
+                        email TEXT,
+                        group_name TEXT,
+                        notes TEXT
+                    )''')
+    # Files written by the first AddressBook only have name, phone and group_name.
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(contacts)")}
+    for column in ("email", "notes"):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE contacts ADD COLUMN {column} TEXT")
+
+
+def _create_indexes(conn):
+    # name: equality lookups by name.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_contacts_name ON contacts (name)")
+    # Case-insensitive listing order, and the keyset paging of the Qt list.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_contacts_name_nocase ON contacts (name COLLATE NOCASE)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_contacts_phone ON contacts (phone)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_contacts_group ON contacts (group_name)")
+
+
+def _create_search_index(conn):
+    # A no-op on SQLite builds without FTS5; searches then fall back to LIKE.
+    ensure_search_index(conn)
+
+
+def _add_phone_canonical(conn):
+    # Normalized phone (see phones.canonical_phone), written alongside phone
+    # by every insert and update; backfilled here for existing rows.
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(contacts)")}
+    if "phone_canonical" not in columns:
+        conn.execute("ALTER TABLE contacts ADD COLUMN phone_canonical TEXT")
+    last = 0
+    while True:
+        rows = conn.execute("SELECT id, phone FROM contacts WHERE id > ? ORDER BY id LIMIT 10000",
+                            (last,)).fetchall()
+        if not rows:
+            break
+        conn.executemany("UPDATE contacts SET phone_canonical=? WHERE id=?",
+                         ((canonical_phone(phone), contact_id) for contact_id, phone in rows))
+        last = rows[-1][0]
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_contacts_phone_canonical ON contacts (phone_canonical)")
+
+
+def _add_group_counts(conn):
+    # Contacts per group, kept current by triggers so the group filter can
+    # show its counts without a GROUP BY over the table. Contacts without a
+    # group are counted under ''.
+    conn.execute("""CREATE TABLE IF NOT EXISTS group_counts (
+                        group_name TEXT PRIMARY KEY,
+                        count INTEGER NOT NULL
+                    ) WITHOUT ROWID""")
+    conn.execute("DELETE FROM group_counts")
+    conn.execute("""INSERT INTO group_counts (group_name, count)
+                    SELECT coalesce(group_name, ''), COUNT(*) FROM contacts GROUP BY 1""")
+    add = """INSERT OR IGNORE INTO group_counts (group_name, count) VALUES (coalesce(new.group_name, ''), 0);
+             UPDATE group_counts SET count = count + 1 WHERE group_name = coalesce(new.group_name, '');"""
+    remove = """UPDATE group_counts SET count = count - 1 WHERE group_name = coalesce(old.group_name, '');
+                DELETE FROM group_counts WHERE group_name = coalesce(old.group_name, '') AND count = 0;"""
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS group_counts_ai AFTER INSERT ON contacts BEGIN {add} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS group_counts_ad AFTER DELETE ON contacts BEGIN {remove} END")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS group_counts_au AFTER UPDATE OF group_name ON contacts
+                     WHEN coalesce(old.group_name, '') <> coalesce(new.group_name, '')
+                     BEGIN {remove} {add} END""")
+    # Contacts of one group in listing order: the group filter pages on this
+    # index the way the full list pages on idx_contacts_name_nocase. It also
+    # serves plain group_name lookups, so the single-column index goes.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_contacts_group_name ON contacts (group_name, name COLLATE NOCASE)")
+    conn.execute("DROP INDEX IF EXISTS idx_contacts_group")
+
+
+def _add_sort_indexes(conn):
+    # The orders of repository.SORT_ORDERS not already served by an index.
+    # Missing phones and groups sort as '', so the expressions never yield
+    # NULL and keyset comparisons on them stay exact.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_contacts_phone_sort ON contacts (coalesce(phone, ''))")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_contacts_group_sort
+                    ON contacts (coalesce(group_name, '') COLLATE NOCASE, name COLLATE NOCASE)""")
+
+
+def _add_change_journal(conn):
+    # One row per insert, update or delete of a contact, in commit order; see
+    # journal.py. AUTOINCREMENT keeps seq from ever being reused, even after
+    # compaction empties the table. Existing contacts are journaled as
+    # inserts, so the changes since 0 are the whole table.
+    conn.execute("""CREATE TABLE IF NOT EXISTS changes (
+                        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                        op TEXT NOT NULL,
+                        contact_id INTEGER NOT NULL
+                    )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_changes_contact ON changes (contact_id, seq)")
+    # Changes up to horizon have been compacted away.
+    conn.execute("""CREATE TABLE IF NOT EXISTS journal_state (
+                        id INTEGER PRIMARY KEY CHECK (id = 1),
+                        horizon INTEGER NOT NULL
+                    )""")
+    conn.execute("INSERT OR IGNORE INTO journal_state (id, horizon) VALUES (1, 0)")
+    conn.execute("INSERT INTO changes (op, contact_id) SELECT 'insert', id FROM contacts ORDER BY id")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS changes_ai AFTER INSERT ON contacts BEGIN
+                        INSERT INTO changes (op, contact_id) VALUES ('insert', new.id);
+                    END""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS changes_ad AFTER DELETE ON contacts BEGIN
+                        INSERT INTO changes (op, contact_id) VALUES ('delete', old.id);
+                    END""")
+    # Only updates that change what a delta carries; rewriting phone_canonical
+    # or an upsert with identical values is not a change.
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS changes_au AFTER UPDATE ON contacts
+                    WHEN old.name IS NOT new.name OR old.phone IS NOT new.phone OR old.email IS NOT new.email
+                         OR old.group_name IS NOT new.group_name OR old.notes IS NOT new.notes
+                    BEGIN
+                        INSERT INTO changes (op, contact_id) VALUES ('update', new.id);
+                    END""")
+
+
+def _add_applied_seq(conn):
+    # The source sequence number a replica has applied deltas up to; see
+    # journal.apply_changes. A database that never applied one is at 0.
+    conn.execute("ALTER TABLE journal_state ADD COLUMN applied INTEGER NOT NULL DEFAULT 0")
+
+
+def _add_phone_search_index(conn):
+    # Digit searches through an index instead of a LIKE scan of
+    # phone_canonical; a no-op without FTS5, like the search index.
+    ensure_phone_index(conn)
+
+
+MIGRATIONS = (
+    _create_contacts,
+    _create_indexes,
+    _create_search_index,
+    _add_phone_canonical,
+    _add_group_counts,
+    _add_sort_indexes,
+    _add_change_journal,
+    _add_applied_seq,
+    _add_phone_search_index,
+)
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Bring the database up to SCHEMA_VERSION and return the version it started at.
+
+    Must be called outside a transaction. Concurrent openers serialize on
+    the write lock and re-read the version, so each step runs once.
+    """
+    version = schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return version
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = start = schema_version(conn)
+        for step in MIGRATIONS[version:]:
+            step(conn)
+            version += 1
+        conn.execute(f"PRAGMA user_version = {version}")
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return start
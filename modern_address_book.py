@@ -1,27 +1,27 @@
+import argparse
 import sys
 import sqlite3
-from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                           QHBoxLayout, QPushButton, QLineEdit, QListWidget,
-                           QLabel, QTabWidget, QFormLayout, QMessageBox, 
-                           QStatusBar, QDialog, QFileDialog, QMenu,
-                           QListWidgetItem, QComboBox, QInputDialog, QSystemTrayIcon)
-from PyQt6.QtCore import Qt, QSize, QTimer
-from PyQt6.QtGui import QIcon, QPixmap, QAction, QFont, QColor, QPalette
-
-class Contact:
-    def __init__(self, name, phone, email="", group="", notes="", contact_id=None):
-        self.id = contact_id
-        self.name = name
-        self.phone = phone
-        self.email = email
-        self.group = group
-        self.notes = notes
-
-    def __str__(self):
-        return f"{self.name} - {self.phone}"
+from contextlib import nullcontext
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
+                           QHBoxLayout, QPushButton, QLineEdit, QListView,
+                           QLabel, QFormLayout, QMessageBox, QDialog, QComboBox,
+                           QFileDialog)
+from PyQt6.QtCore import Qt, QThreadPool, QTimer, pyqtSignal
+from PyQt6.QtGui import QAction
+import backup
+from contact import Contact
+from contact_model import COUNT_LIMIT, ContactListModel
+from db import ConnectionManager
+from repository import ContactRepository
+from search_controller import SearchController
+# ContactIndex, DiagnosticsPanel and Instrumentation are imported when first
+# needed: most launches use none of them.
+
+# Offered by the group combo box until the book has groups of its own.
+DEFAULT_GROUPS = ["Family", "Friends", "Work", "Other"]
 
 class ContactDialog(QDialog):
-    def __init__(self, contact=None, parent=None):
+    def __init__(self, contact=None, parent=None, groups=()):
         super().__init__(parent)
         self.contact = contact
         self.setWindowTitle("Edit Contact" if contact else "Add Contact")
@@ -37,7 +37,7 @@ class ContactDialog(QDialog):
         self.email_edit = QLineEdit()
         self.group_combo = QComboBox()
         self.group_combo.setEditable(True)
-        self.group_combo.addItems(["Family", "Friends", "Work", "Other"])
+        self.group_combo.addItems([group for group in groups if group] or DEFAULT_GROUPS)
         self.notes_edit = QLineEdit()
         
         form.addRow("Name:", self.name_edit)
@@ -78,56 +78,99 @@ class ContactDialog(QDialog):
         }
 
 class ModernAddressBook(QMainWindow):
-    def __init__(self):
+    # Emitted from the pool thread that opens the database
+    databaseReady = pyqtSignal(object, object)
+    databaseFailed = pyqtSignal(str)
+    # Emitted from the pool thread running a backup or restore
+    backupProgress = pyqtSignal(int, int)
+    backupFinished = pyqtSignal(object)
+    backupFailed = pyqtSignal(str)
+    restoreFinished = pyqtSignal(object, object, object)
+
+    def __init__(self, use_index=False, db_file='address_book.db', instrumentation=None):
         super().__init__()
+        self.use_index = use_index
+        self.db_file = db_file
+        # Optional Instrumentation: query timings and refresh captures in a Diagnostics dock
+        self.instrumentation = instrumentation
         self.setWindowTitle("Modern Address Book")
         self.setMinimumSize(900, 600)
         
-        # Initialize database
-        self.init_database()
+        # Connections open lazily, so this does no I/O
+        self.db = ConnectionManager(self.db_file, instrumentation=self.instrumentation)
+        self.repository = None
+        self.index = None
         
         # Set up the UI
         self.setup_ui()
         
-        # Load contacts
-        self.load_contacts()
-        
         # Apply modern styling
         self.apply_styles()
+
+        # The window paints first; the schema check, sample data and optional
+        # index are prepared on a pool thread and contacts load when they are ready
+        self.databaseReady.connect(self.database_ready)
+        self.databaseFailed.connect(self.database_failed)
+        self.backupProgress.connect(self.backup_progress)
+        self.backupFinished.connect(self.backup_finished)
+        self.backupFailed.connect(self.backup_failed)
+        self.restoreFinished.connect(self.restore_finished)
+        self.centralWidget().setEnabled(False)
+        self.statusBar().showMessage("Opening address book...")
+        QTimer.singleShot(0, lambda: QThreadPool.globalInstance().start(self.init_database))
     
     def init_database(self):
-        self.conn = sqlite3.connect('address_book.db')
-        cursor = self.conn.cursor()
-        
-        # Drop existing table if it exists
-        cursor.execute("DROP TABLE IF EXISTS contacts")
-        
-        # Create new table with updated schema
-        cursor.execute('''
-            CREATE TABLE contacts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                phone TEXT,
-                email TEXT,
-                group_name TEXT,
-                notes TEXT
-            )
-        ''')
-        self.conn.commit()
-        
-        # Insert some sample data if the table is empty
-        cursor.execute("SELECT COUNT(*) FROM contacts")
-        if cursor.fetchone()[0] == 0:
-            sample_contacts = [
-                ("John Doe", "123-456-7890", "john@example.com", "Work", "Work colleague"),
-                ("Jane Smith", "098-765-4321", "jane@example.com", "Friends", "Met at conference"),
-                ("Alice Johnson", "555-123-4567", "alice@example.com", "Family", "Cousin")
-            ]
-            cursor.executemany(
-                "INSERT INTO contacts (name, phone, email, group_name, notes) VALUES (?, ?, ?, ?, ?)",
-                sample_contacts
-            )
-            self.conn.commit()
+        # Runs on a pool thread; the repository's ConnectionManager gives it its own connection
+        try:
+            repository, index = self.prepare_database()
+        except sqlite3.Error as e:
+            self.databaseFailed.emit(str(e))
+            return
+        self.databaseReady.emit(repository, index)
+
+    def prepare_database(self):
+        repository = ContactRepository(self.db)
+            
+        # Insert some sample data into a newly created database
+        if repository.created and repository.count() == 0:
+            repository.add_many([
+                Contact("John Doe", "123-456-7890", "Work", email="john@example.com", notes="Work colleague"),
+                Contact("Jane Smith", "098-765-4321", "Friends", email="jane@example.com", notes="Met at conference"),
+                Contact("Alice Johnson", "555-123-4567", "Family", email="alice@example.com", notes="Cousin")
+            ])
+
+        # Optional in-memory index: the search box then matches names and
+        # phones on the GUI thread as you type, instead of every field in SQLite
+        index = None
+        if self.use_index:
+            from contact_index import ContactIndex
+            index = ContactIndex.from_repository(repository)
+        return repository, index
+
+    def database_ready(self, repository, index):
+        if self.search_controller is not None:
+            self.search_controller.close()
+        self.repository = repository
+        self.index = index
+
+        # Typing is debounced and searched off the GUI thread
+        self.search_controller = SearchController(self.repository, parent=self)
+        self.search_controller.resultsReady.connect(self.show_search_results)
+        self.search_controller.searchFailed.connect(
+            lambda message: self.statusBar().showMessage(f"Search failed: {message}", 3000))
+
+        # Contact list: a view over a model that only materializes visible rows
+        self.contact_model = ContactListModel(self.repository, self.index, self)
+        self.contact_list.setModel(self.contact_model)
+        self.contact_list.selectionModel().currentChanged.connect(self.show_contact_details)
+
+        self.refresh_group_filter()
+        self.load_contacts(self.search_edit.text())
+        self.centralWidget().setEnabled(True)
+
+    def database_failed(self, message):
+        QMessageBox.critical(self, "Database Error", f"Could not open the address book: {message}")
+        self.statusBar().showMessage("Error opening address book")
     
     def setup_ui(self):
         # Central widget and main layout
@@ -141,19 +184,26 @@ class ModernAddressBook(QMainWindow):
         # Search bar
         search_layout = QHBoxLayout()
         self.search_edit = QLineEdit()
-        self.search_edit.setPlaceholderText("Search contacts...")
-        self.search_edit.textChanged.connect(self.filter_contacts)
+        self.search_edit.setPlaceholderText(
+            "Search names and phones..." if self.use_index else "Search contacts...")
+        self.search_controller = None
+        self.search_edit.textChanged.connect(self.search_text_changed)
         search_btn = QPushButton("🔍")
         search_btn.setFixedWidth(40)
         search_btn.clicked.connect(self.filter_contacts)
         
         search_layout.addWidget(self.search_edit)
         search_layout.addWidget(search_btn)
+
+        # Group filter, labelled with counts the database keeps up to date on every write
+        self.group_filter = QComboBox()
+        self.group_filter.currentIndexChanged.connect(self.filter_contacts)
         
-        # Contact list
-        self.contact_list = QListWidget()
-        self.contact_list.itemDoubleClicked.connect(self.edit_contact)
-        self.contact_list.itemSelectionChanged.connect(self.show_contact_details)
+        # Contact list; its model is set once the database is open
+        self.contact_model = None
+        self.contact_list = QListView()
+        self.contact_list.setUniformItemSizes(True)
+        self.contact_list.doubleClicked.connect(self.edit_contact)
         
         # Right panel - Contact details
         right_panel = QVBoxLayout()
@@ -191,6 +241,7 @@ class ModernAddressBook(QMainWindow):
         
         # Add widgets to main layout
         left_panel.addLayout(search_layout)
+        left_panel.addWidget(self.group_filter)
         left_panel.addWidget(self.contact_list)
         
         main_layout.addLayout(left_panel, 40)
@@ -201,6 +252,15 @@ class ModernAddressBook(QMainWindow):
         
         # Status bar
         self.statusBar().showMessage("Ready")
+
+        # Diagnostics dock and a running query summary in the status bar
+        if self.instrumentation is not None:
+            from debug_panel import DiagnosticsPanel
+            self.diagnostics = DiagnosticsPanel(self.instrumentation, self)
+            self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.diagnostics)
+            self.diagnostics.hide()
+            self.statusBar().addPermanentWidget(self.diagnostics.status_label)
+            self.view_menu.addAction(self.diagnostics.toggleViewAction())
     
     def create_menu_bar(self):
         menu_bar = self.menuBar()
@@ -211,6 +271,17 @@ class ModernAddressBook(QMainWindow):
         new_action = QAction("&New Contact", self)
         new_action.triggered.connect(self.add_contact)
         file_menu.addAction(new_action)
+
+        backup_action = QAction("&Back Up...", self)
+        backup_action.triggered.connect(lambda: self.back_up(compact=False))
+        snapshot_action = QAction("Export Read-Only &Snapshot...", self)
+        snapshot_action.triggered.connect(lambda: self.back_up(compact=True))
+        restore_action = QAction("&Restore from Backup...", self)
+        restore_action.triggered.connect(self.restore_backup)
+        file_menu.addSeparator()
+        file_menu.addAction(backup_action)
+        file_menu.addAction(snapshot_action)
+        file_menu.addAction(restore_action)
         
         import_action = QAction("&Import...", self)
         export_action = QAction("&Export...", self)
@@ -228,23 +299,26 @@ class ModernAddressBook(QMainWindow):
         
         preferences_action = QAction("&Preferences...", self)
         edit_menu.addAction(preferences_action)
+
+        # View menu
+        self.view_menu = menu_bar.addMenu("&View")
     
     def apply_styles(self):
         self.setStyleSheet("""
             QMainWindow {
                 background-color: #f5f5f5;
             }
-            QListWidget {
+            QListView {
                 background-color: white;
                 border: 1px solid #ddd;
                 border-radius: 4px;
                 padding: 5px;
             }
-            QListWidget::item {
+            QListView::item {
                 padding: 8px;
                 border-bottom: 1px solid #eee;
             }
-            QListWidget::item:selected {
+            QListView::item:selected {
                 background-color: #e3f2fd;
                 color: #1976d2;
             }
@@ -273,76 +347,89 @@ class ModernAddressBook(QMainWindow):
             }
         """)
     
+    def capture(self, name):
+        # Times a UI refresh, and the SQL it runs, when instrumentation is on.
+        return self.instrumentation.capture(name) if self.instrumentation is not None else nullcontext()
+
+    def refresh_group_filter(self):
+        with self.capture("refresh_group_filter"):
+            self._refresh_group_filter()
+
+    def _refresh_group_filter(self):
+        counts = self.repository.group_counts()
+        current = self.group_filter.currentData()
+        self.group_filter.blockSignals(True)
+        self.group_filter.clear()
+        self.group_filter.addItem(f"All groups ({sum(counts.values())})", None)
+        for group, count in counts.items():
+            self.group_filter.addItem(f"{group or 'No group'} ({count})", group)
+        index = self.group_filter.findData(current)
+        self.group_filter.setCurrentIndex(max(index, 0))
+        self.group_filter.blockSignals(False)
+        if index < 0 and current is not None:
+            # The selected group lost its last contact.
+            self.filter_contacts()
+
     def load_contacts(self, filter_text=""):
-        self.contact_list.clear()
-        cursor = self.conn.cursor()
-        
+        with self.capture("load_contacts"):
+            self._load_contacts(filter_text)
+
+    def _load_contacts(self, filter_text):
         try:
-            # Ensure the contacts table exists
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS contacts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    phone TEXT,
-                    email TEXT,
-                    group_name TEXT,
-                    notes TEXT
-                )
-            """)
-            
-            if filter_text:
-                cursor.execute("""
-                    SELECT id, name, phone, email, group_name, notes 
-                    FROM contacts 
-                    WHERE name LIKE ? OR phone LIKE ? OR email LIKE ? OR group_name LIKE ?
-                    ORDER BY name
-                """, (f"%{filter_text}%", f"%{filter_text}%", f"%{filter_text}%", f"%{filter_text}%"))
-            else:
-                cursor.execute("""
-                    SELECT id, name, phone, email, group_name, notes 
-                    FROM contacts 
-                    ORDER BY name
-                """)
-            
-            rows = cursor.fetchall()
-            if not rows:
+            self.contact_model.set_filter(filter_text, group=self.group_filter.currentData())
+            total = self.contact_model.count()
+            if not total:
                 self.statusBar().showMessage("No contacts found. Add a new contact to get started.", 3000)
                 return
-                
-            for row in rows:
-                try:
-                    contact = Contact(
-                        contact_id=row[0],
-                        name=row[1] or "Unnamed Contact",
-                        phone=row[2] or "",
-                        email=row[3] or "",
-                        group=row[4] or "",
-                        notes=row[5] or ""
-                    )
-                    item = QListWidgetItem(str(contact))
-                    item.setData(Qt.ItemDataRole.UserRole, contact)
-                    self.contact_list.addItem(item)
-                except Exception as e:
-                    print(f"Error loading contact: {e}")
-                    continue
-                    
-            self.statusBar().showMessage(f"Loaded {len(rows)} contacts", 3000)
+
+            shown = f"{COUNT_LIMIT:,}+" if self.contact_model.count_capped(total) else total
+            self.statusBar().showMessage(f"Loaded {shown} contacts", 3000)
             
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Database Error", f"An error occurred while loading contacts: {str(e)}")
             self.statusBar().showMessage("Error loading contacts", 3000)
     
+    def current_contact(self):
+        if self.contact_model is None:
+            return None
+        index = self.contact_list.currentIndex()
+        if not index.isValid():
+            return None
+        return self.contact_model.contact(index.row())
+    
+    def search_text_changed(self, text):
+        if self.index is not None:
+            self.load_contacts(text)
+        else:
+            self.search_controller.request(text, group=self.group_filter.currentData())
+
     def filter_contacts(self):
-        filter_text = self.search_edit.text()
-        self.load_contacts(filter_text)
+        with self.capture("filter_contacts"):
+            self._filter_contacts()
+
+    def _filter_contacts(self):
+        if self.index is not None:
+            self.load_contacts(self.search_edit.text())
+        else:
+            self.search_controller.request(self.search_edit.text(), immediate=True,
+                                           group=self.group_filter.currentData())
+    
+    def show_search_results(self, filter_text, group, rows, total):
+        with self.capture("show_search_results"):
+            self._show_search_results(filter_text, group, rows, total)
+
+    def _show_search_results(self, filter_text, group, rows, total):
+        self.contact_model.set_filter(filter_text, rows, complete=len(rows) == total, group=group)
+        if total:
+            self.statusBar().showMessage(f"Found {total} contacts", 3000)
+        else:
+            self.statusBar().showMessage("No contacts found.", 3000)
     
     def add_contact(self):
+        if self.repository is None:
+            return
         try:
-            # Ensure database connection is open
-            if not hasattr(self, 'conn') or not self.conn:
-                self.init_database()
-                
-            dialog = ContactDialog()
+            dialog = ContactDialog(groups=self.repository.group_counts())
             if dialog.exec() == QDialog.DialogCode.Accepted:
                 data = dialog.get_contact_data()
                 
@@ -351,19 +438,19 @@ class ModernAddressBook(QMainWindow):
                     QMessageBox.warning(self, "Validation Error", "Name is required!")
                     return
                     
-                cursor = self.conn.cursor()
-                cursor.execute("""
-                    INSERT INTO contacts (name, phone, email, group_name, notes)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
+                contact = self.repository.add(Contact(
                     data['name'].strip(),
                     data['phone'].strip(),
-                    data['email'].strip(),
                     data['group'].strip(),
-                    data['notes'].strip()
+                    email=data['email'].strip(),
+                    notes=data['notes'].strip()
                 ))
-                self.conn.commit()
-                self.load_contacts()
+                if self.index is not None:
+                    self.index.add(contact.id, contact.name, contact.phone)
+                row = self.contact_model.contact_added(contact)
+                if row >= 0:
+                    self.contact_list.setCurrentIndex(self.contact_model.index(row))
+                self.refresh_group_filter()
                 self.statusBar().showMessage("Contact added successfully", 3000)
                 
         except sqlite3.Error as e:
@@ -371,29 +458,30 @@ class ModernAddressBook(QMainWindow):
             self.statusBar().showMessage("Error adding contact", 3000)
     
     def edit_contact(self):
-        current_item = self.contact_list.currentItem()
-        if not current_item:
+        contact = self.current_contact()
+        if not contact:
             QMessageBox.warning(self, "No Selection", "Please select a contact to edit.")
             return
             
-        contact = current_item.data(Qt.ItemDataRole.UserRole)
-        dialog = ContactDialog(contact, self)
+        dialog = ContactDialog(contact, self, self.repository.group_counts())
         if dialog.exec() == QDialog.DialogCode.Accepted:
             data = dialog.get_contact_data()
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                UPDATE contacts 
-                SET name=?, phone=?, email=?, group_name=?, notes=?
-                WHERE id=?
-            """, (data['name'], data['phone'], data['email'], data['group'], data['notes'], contact.id))
-            self.conn.commit()
-            self.load_contacts()
+            updated = Contact(data['name'], data['phone'], data['group'], contact.id,
+                              email=data['email'], notes=data['notes'])
+            self.repository.update(updated)
+            if self.index is not None:
+                self.index.update(updated.id, updated.name, updated.phone)
+            row = self.contact_model.contact_changed(contact, updated)
+            if row >= 0:
+                self.contact_list.setCurrentIndex(self.contact_model.index(row))
+            self.refresh_group_filter()
+            self.show_contact_details()
             self.statusBar().showMessage("Contact updated successfully", 3000)
     
     def show_contact_details(self):
         """Display the details of the currently selected contact."""
-        current_item = self.contact_list.currentItem()
-        if not current_item:
+        contact = self.current_contact()
+        if not contact:
             # Clear the details if no contact is selected
             self.name_label.clear()
             self.phone_label.clear()
@@ -402,20 +490,17 @@ class ModernAddressBook(QMainWindow):
             self.notes_label.clear()
             return
             
-        contact = current_item.data(Qt.ItemDataRole.UserRole)
-        if contact:
-            self.name_label.setText(contact.name)
-            self.phone_label.setText(contact.phone)
-            self.email_label.setText(contact.email)
-            self.group_label.setText(contact.group)
-            self.notes_label.setText(contact.notes)
+        self.name_label.setText(contact.name)
+        self.phone_label.setText(contact.phone)
+        self.email_label.setText(contact.email)
+        self.group_label.setText(contact.group)
+        self.notes_label.setText(contact.notes)
     
     def delete_contact(self):
-        current_item = self.contact_list.currentItem()
-        if not current_item:
+        contact = self.current_contact()
+        if not contact:
             return
             
-        contact = current_item.data(Qt.ItemDataRole.UserRole)
         reply = QMessageBox.question(
             self, 'Delete Contact',
             f'Are you sure you want to delete {contact.name}?',
@@ -424,14 +509,79 @@ class ModernAddressBook(QMainWindow):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM contacts WHERE id=?", (contact.id,))
-            self.conn.commit()
-            self.load_contacts()
+            self.repository.delete(contact.id)
+            if self.index is not None:
+                self.index.remove(contact.id)
+            self.contact_model.contact_removed(contact)
+            self.refresh_group_filter()
             self.statusBar().showMessage("Contact deleted", 3000)
     
+    def back_up(self, compact):
+        title = "Export Read-Only Snapshot" if compact else "Back Up Address Book"
+        filename, _ = QFileDialog.getSaveFileName(self, title, "address_book_backup.db",
+                                                  "SQLite databases (*.db);;All files (*)")
+        if not filename:
+            return
+        self.statusBar().showMessage("Backing up...")
+
+        def run():
+            # Copied a few MB per step on a pool thread; the window stays responsive throughout
+            try:
+                report = backup.snapshot(self.db, filename, compact=compact, progress=self.backupProgress.emit)
+            except (sqlite3.Error, OSError) as e:
+                self.backupFailed.emit(str(e))
+                return
+            self.backupFinished.emit(report)
+        QThreadPool.globalInstance().start(run)
+
+    def restore_backup(self):
+        if self.repository is None:
+            return
+        filename, _ = QFileDialog.getOpenFileName(self, "Restore from Backup", "",
+                                                  "SQLite databases (*.db);;All files (*)")
+        if not filename:
+            return
+        reply = QMessageBox.question(
+            self, "Restore from Backup",
+            "Replace every contact in this address book with the contents of the backup?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        self.centralWidget().setEnabled(False)
+        self.statusBar().showMessage("Restoring...")
+
+        def run():
+            # backup.restore migrates an older backup; the index must be rebuilt from what was restored
+            try:
+                report = backup.restore(self.db, filename, progress=self.backupProgress.emit)
+                repository, index = self.prepare_database()
+            except (sqlite3.Error, OSError) as e:
+                self.backupFailed.emit(str(e))
+                return
+            self.restoreFinished.emit(report, repository, index)
+        QThreadPool.globalInstance().start(run)
+
+    def backup_progress(self, done, total):
+        if total:
+            self.statusBar().showMessage(f"Copying... {done * 100 // total}%")
+
+    def backup_finished(self, report):
+        self.statusBar().showMessage(f"Backed up: {report}", 5000)
+
+    def backup_failed(self, message):
+        QMessageBox.critical(self, "Backup Error", f"The backup or restore failed: {message}")
+        self.statusBar().showMessage("Backup failed", 3000)
+        self.centralWidget().setEnabled(self.repository is not None)
+
+    def restore_finished(self, report, repository, index):
+        self.database_ready(repository, index)
+        self.statusBar().showMessage(f"Restored: {report}", 5000)
+
     def closeEvent(self, event):
-        self.conn.close()
+        if self.search_controller is not None:
+            self.search_controller.close()
+        QThreadPool.globalInstance().waitForDone()
+        self.db.close()
         event.accept()
 
 def main():
@@ -443,7 +593,22 @@ def main():
     app.setOrganizationName("Your Company")
     app.setOrganizationDomain("yourcompany.com")
     
-    window = ModernAddressBook()
+    parser = argparse.ArgumentParser(description="Modern Address Book")
+    parser.add_argument("--index", action="store_true",
+                        help="search names and phones as you type from an in-memory index, instead of every field")
+    parser.add_argument("--instrument", action="store_true", help="time every query; see View > Diagnostics")
+    parser.add_argument("--slow-query-ms", type=float, help="log queries slower than this (implies --instrument)")
+    parser.add_argument("--profile", action="store_true", help="cProfile each UI refresh (implies --instrument)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="record the tracemalloc peak of each UI refresh (implies --instrument)")
+    args, _ = parser.parse_known_args(app.arguments()[1:])
+    instrumentation = None
+    if args.instrument or args.slow_query_ms is not None or args.profile or args.trace_memory:
+        from instrumentation import Instrumentation
+        instrumentation = Instrumentation(slow_query_ms=args.slow_query_ms, profile=args.profile,
+                                          trace_memory=args.trace_memory)
+
+    window = ModernAddressBook(use_index=args.index, instrumentation=instrumentation)
     window.show()
     sys.exit(app.exec())
 
@@ -0,0 +1,39 @@
+import re
+
+# Country calling code assumed for numbers written without one.
+DEFAULT_COUNTRY_CODE = "1"
+
+_NON_DIGIT = re.compile(r"\D")
+_PHONE_TERM = re.compile(r"[\d\s+().\-/]+")
+
+
+def canonical_phone(phone, country_code=DEFAULT_COUNTRY_CODE):
+    """Reduce a free-text phone number to its digits with the country code, or None.
+
+    "123-456-7890", "(123) 4567890" and "+1 123 456 7890" all become
+    "11234567890". Numbers starting with "+" or "00", or with
+    ``country_code`` followed by ten or more digits, already carry their
+    country code; other numbers get ``country_code`` in front. Extensions
+    and letters are not interpreted.
+    """
+    if not phone:
+        return None
+    text = phone.strip()
+    digits = _NON_DIGIT.sub("", text)
+    if not digits:
+        return None
+    if text.startswith("+"):
+        return digits
+    if digits.startswith("00"):
+        return digits[2:] or None
+    if digits.startswith(country_code) and len(digits) - len(country_code) >= 10:
+        return digits
+    return country_code + digits
+
+
+def phone_term(term):
+    """The digits of a search term that looks like (part of) a phone number, else None."""
+    if not _PHONE_TERM.fullmatch(term.strip()):
+        return None
+    digits = _NON_DIGIT.sub("", term)
+    return digits if len(digits) >= 3 else None
@@ -0,0 +1,317 @@
+from itertools import islice
+
+from contact import Contact
+from dedup import DUPLICATE_RULES, find_duplicates
+from migrations import migrate
+from phones import canonical_phone
+from search import match_clause, phone_index_ready, search_index_ready, search_rows
+
+# Column order expected by Contact.from_row.
+CONTACT_COLUMNS = ("id", "name", "phone", "email", "group_name", "notes")
+SELECT_CONTACTS = f"SELECT {', '.join(CONTACT_COLUMNS)} FROM contacts"
+
+DEFAULT_PAGE_SIZE = 200
+
+# Rows handed to executemany per call by the bulk methods; keeps the parameter
+# list bounded while everything still lands in a single transaction.
+BULK_CHUNK_SIZE = 10000
+
+# Ids per "IN (...)" lookup, under SQLite's default host parameter limit.
+_ID_CHUNK = 500
+
+# Orders page() can list contacts in: the ORDER BY terms, each served by an
+# index (see migrations), ending in id so that every row has a unique key.
+SORT_ORDERS = {
+    "id": ("id",),
+    "name": ("name COLLATE NOCASE", "id"),
+    "phone": ("coalesce(phone, '')", "id"),
+    "group": ("coalesce(group_name, '') COLLATE NOCASE", "name COLLATE NOCASE", "id"),
+}
+
+# SQLite's NOCASE collation only folds ASCII letters.
+_NOCASE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+_INSERT = ("INSERT INTO contacts (name, phone, email, group_name, notes, phone_canonical)"
+           " VALUES (?, ?, ?, ?, ?, ?)")
+_UPDATE = "UPDATE contacts SET name=?, phone=?, email=?, group_name=?, notes=?, phone_canonical=? WHERE id=?"
+
+
+def nocase_key(name):
+    """Sort key that orders names the way ``COLLATE NOCASE`` does."""
+    # str.lower() folds exactly the ASCII letters on ASCII text and is far
+    # cheaper than translate().
+    return name.lower() if name.isascii() else name.translate(_NOCASE)
+
+
+def sort_key(contact, order="name"):
+    """The keyset key of ``contact`` in ``order``: what page() takes as ``after``."""
+    if order == "id":
+        return (contact.id,)
+    if order == "phone":
+        return (contact.phone or "", contact.id)
+    if order == "group":
+        return (contact.group or "", contact.name, contact.id)
+    return (contact.name, contact.id)
+
+
+def _order_by(order, descending):
+    return ", ".join(f"{term} DESC" if descending else term for term in SORT_ORDERS[order])
+
+
+def contact_factory(cursor, row):
+    return Contact.from_row(row)
+
+
+def _insert_params(contact):
+    if isinstance(contact, Contact):
+        return (contact.name, contact.phone, contact.email, contact.group, contact.notes,
+                canonical_phone(contact.phone))
+    name, phone, *rest = contact
+    return (name, phone, "", rest[0] if rest else "", "", canonical_phone(phone))
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ContactRepository:
+    """All SQL over the contacts table, returning Contact records.
+
+    Built on a ConnectionManager, so one repository can be shared by the
+    GUI thread and worker threads; each thread queries on its own connection.
+    """
+
+    def __init__(self, db):
+        self._db = db
+        conn = db.connect()
+        # True when this call created the schema in a new database file.
+        self.created = migrate(conn) == 0
+        self.fts = search_index_ready(conn)
+        self.phone_index = phone_index_ready(conn)
+
+    def transaction(self):
+        return self._db.transaction()
+
+    def connection(self):
+        """The calling thread's connection."""
+        return self._db.connect()
+
+    def _cursor(self):
+        cursor = self._db.connect().cursor()
+        cursor.row_factory = contact_factory
+        return cursor
+
+    def _where(self, filter_text, after=None, group=None, order="name", descending=False):
+        clauses, params = self._clauses(filter_text, after, group, order, descending)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _clauses(self, filter_text, after=None, group=None, order="name", descending=False):
+        clauses, params = [], []
+        if group is not None:
+            # '' selects contacts without a group, as in group_counts().
+            clauses.append("(group_name = ? OR group_name IS NULL)" if group == "" else "group_name = ?")
+            params.append(group)
+        if filter_text:
+            where, where_params = match_clause(filter_text, self.fts, self.phone_index)
+            clauses.append(where)
+            params.extend(where_params)
+        if after is not None:
+            # The bare bound on the first term ("name >= ?") lets SQLite seek
+            # the order's index; the row-value comparison alone is evaluated
+            # as a scan.
+            terms = SORT_ORDERS[order]
+            op = "<" if descending else ">"
+            if len(terms) == 1:
+                clauses.append(f"{terms[0]} {op} ?")
+            else:
+                clauses.append(f"{terms[0]} {op}= ? AND ({', '.join(terms)}) {op} ({', '.join('?' * len(terms))})")
+                params.append(after[0])
+            params.extend(after)
+        return clauses, params
+
+    # Reads
+
+    def get(self, contact_id):
+        """Return the Contact with ``contact_id``, or None."""
+        return self._cursor().execute(f"{SELECT_CONTACTS} WHERE id = ?", (contact_id,)).fetchone()
+
+    def get_many(self, ids):
+        """Return the Contacts with the given ids, in no particular order."""
+        ids = list(ids)
+        contacts = []
+        for i in range(0, len(ids), _ID_CHUNK):
+            chunk = ids[i:i + _ID_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            contacts.extend(self._cursor().execute(f"{SELECT_CONTACTS} WHERE id IN ({placeholders})", chunk))
+        return contacts
+
+    def all(self):
+        return self._cursor().execute(f"{SELECT_CONTACTS} ORDER BY id").fetchall()
+
+    def all_by_name(self):
+        """Return every Contact ordered by name, case-insensitively, then id."""
+        return self._cursor().execute(f"{SELECT_CONTACTS} ORDER BY name COLLATE NOCASE, id").fetchall()
+
+    def name_phone_rows(self):
+        """Cursor over (id, name, phone) of every contact, for building in-memory indexes."""
+        return self._db.connect().execute("SELECT id, name, phone FROM contacts")
+
+    def by_name(self, name):
+        return self._cursor().execute(f"{SELECT_CONTACTS} WHERE name = ?", (name,)).fetchall()
+
+    def by_phone(self, phone):
+        """Return the Contacts whose phone is the same number as ``phone``, however written."""
+        return self._cursor().execute(
+            f"{SELECT_CONTACTS} WHERE phone_canonical = ? ORDER BY id", (canonical_phone(phone),)).fetchall()
+
+    def search(self, term, limit=-1):
+        """Return Contacts matching ``term``, best match first."""
+        return search_rows(self._cursor(), CONTACT_COLUMNS, term, self.fts, limit, self.phone_index).fetchall()
+
+    def page(self, filter_text="", after=None, limit=DEFAULT_PAGE_SIZE, group=None, order="name",
+             descending=False, offset=0):
+        """Return up to ``limit`` Contacts sorting after the key ``after``.
+
+        By default contacts are ordered by name case-insensitively, then id,
+        the order of ``(nocase_key(name), id)``; ``order`` picks another of
+        SORT_ORDERS and ``after`` is then that order's sort_key(). ``group``
+        keeps one group's contacts. ``offset`` skips rows past ``after``; it
+        walks the index, so keyset paging is preferred wherever the previous
+        page is known.
+        """
+        where, params = self._where(filter_text, after, group, order, descending)
+        return self._cursor().execute(
+            f"{SELECT_CONTACTS}{where} ORDER BY {_order_by(order, descending)} LIMIT ? OFFSET ?",
+            params + [limit, offset]).fetchall()
+
+    def iter_contacts(self, filter_text="", batch_size=DEFAULT_PAGE_SIZE, group=None):
+        """Yield Contacts in page() order, querying ``batch_size`` rows at a time.
+
+        Each batch is its own keyset query, so no cursor stays open between
+        batches and memory is bounded by one batch.
+        """
+        after = None
+        while True:
+            contacts = self.page(filter_text, after, batch_size, group)
+            yield from contacts
+            if len(contacts) < batch_size:
+                return
+            after = (contacts[-1].name, contacts[-1].id)
+
+    def count(self, filter_text="", group=None, after=None, order="name", descending=False):
+        """Return the number of contacts matching, or of those page() would list after ``after``."""
+        if not filter_text and after is None:
+            # Answered from the trigger-maintained group_counts table.
+            if group is None:
+                return self._db.connect().execute("SELECT coalesce(sum(count), 0) FROM group_counts").fetchone()[0]
+            row = self._db.connect().execute("SELECT count FROM group_counts WHERE group_name = ?", (group,)).fetchone()
+            return row[0] if row else 0
+        where, params = self._where(filter_text, after, group, order, descending)
+        return self._db.connect().execute(f"SELECT COUNT(*) FROM contacts{where}", params).fetchone()[0]
+
+    def group_counts(self):
+        """Return {group: number of contacts} ordered by group name, '' for contacts without one.
+
+        Read from the trigger-maintained group_counts table, so the cost
+        depends on the number of groups, not contacts.
+        """
+        return dict(self._db.connect().execute(
+            "SELECT group_name, count FROM group_counts ORDER BY group_name COLLATE NOCASE"))
+
+    def find_duplicates(self, rules=DUPLICATE_RULES):
+        """Return DuplicateGroups of contacts sharing a phone, an email or a near-identical name."""
+        return find_duplicates(self._db.connect(), rules)
+
+    def matches(self, contact_id, filter_text, group=None):
+        clauses, params = self._clauses(filter_text, group=group)
+        sql = " AND ".join(["SELECT 1 FROM contacts WHERE id = ?"] + clauses)
+        return self._db.connect().execute(sql, [contact_id] + params).fetchone() is not None
+
+    # Writes
+
+    def add(self, contact):
+        """Insert ``contact``, set its id and return it."""
+        with self._db.transaction() as conn:
+            contact.id = conn.execute(_INSERT, _insert_params(contact)).lastrowid
+        return contact
+
+    def add_many(self, contacts):
+        """Insert Contacts or (name, phone[, group]) tuples in one transaction; return their ids."""
+        ids = []
+        with self._db.transaction() as conn:
+            for chunk in _chunks((_insert_params(contact) for contact in contacts), BULK_CHUNK_SIZE):
+                conn.executemany(_INSERT, chunk)
+                # The transaction holds the write lock, so the chunk received
+                # consecutive rowids ending at last_insert_rowid().
+                last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                ids.extend(range(last - len(chunk) + 1, last + 1))
+        return ids
+
+    def update(self, contact):
+        """Write every field of ``contact`` back by id; return whether it existed."""
+        with self._db.transaction() as conn:
+            return conn.execute(_UPDATE, _insert_params(contact) + (contact.id,)).rowcount > 0
+
+    def update_by_name(self, name, phone, group):
+        """Set phone and group on every contact called ``name``; return their ids."""
+        with self._db.transaction() as conn:
+            ids = [row[0] for row in conn.execute("SELECT id FROM contacts WHERE name=?", (name,))]
+            conn.execute("UPDATE contacts SET phone=?, phone_canonical=?, group_name=? WHERE name=?",
+                         (phone, canonical_phone(phone), group, name))
+        return ids
+
+    def update_many_by_name(self, updates):
+        """Apply (name, phone, group) tuples in one transaction; return rows changed."""
+        updated = 0
+        with self._db.transaction() as conn:
+            params = ((phone, canonical_phone(phone), group, name) for name, phone, group in updates)
+            for chunk in _chunks(params, BULK_CHUNK_SIZE):
+                updated += conn.executemany(
+                    "UPDATE contacts SET phone=?, phone_canonical=?, group_name=? WHERE name=?", chunk).rowcount
+        return updated
+
+    def delete(self, contact_id):
+        with self._db.transaction() as conn:
+            return conn.execute("DELETE FROM contacts WHERE id=?", (contact_id,)).rowcount > 0
+
+    def delete_by_name(self, name):
+        """Delete every contact called ``name``; return their ids."""
+        with self._db.transaction() as conn:
+            ids = [row[0] for row in conn.execute("SELECT id FROM contacts WHERE name=?", (name,))]
+            conn.execute("DELETE FROM contacts WHERE name=?", (name,))
+        return ids
+
+    def delete_many(self, ids):
+        deleted = 0
+        with self._db.transaction() as conn:
+            for chunk in _chunks(((contact_id,) for contact_id in ids), BULK_CHUNK_SIZE):
+                deleted += conn.executemany("DELETE FROM contacts WHERE id=?", chunk).rowcount
+        return deleted
+
+    def merge(self, keep_id, duplicate_ids):
+        """Fold the contacts ``duplicate_ids`` into ``keep_id`` and delete them.
+
+        Empty fields of the kept contact are filled from the duplicates in id
+        order, and their notes are appended. Returns the merged Contact, or
+        None if ``keep_id`` does not exist.
+        """
+        duplicate_ids = [contact_id for contact_id in duplicate_ids if contact_id != keep_id]
+        with self._db.transaction() as conn:
+            keep = self.get(keep_id)
+            if keep is None:
+                return None
+            duplicates = sorted(self.get_many(duplicate_ids), key=lambda contact: contact.id)
+            for contact in duplicates:
+                for field in ("phone", "email", "group"):
+                    if not getattr(keep, field):
+                        setattr(keep, field, getattr(contact, field))
+                if contact.notes and contact.notes not in keep.notes:
+                    keep.notes = f"{keep.notes}\n{contact.notes}" if keep.notes else contact.notes
+            conn.execute(_UPDATE, _insert_params(keep) + (keep.id,))
+            conn.executemany("DELETE FROM contacts WHERE id=?", ((contact.id,) for contact in duplicates))
+        return keep
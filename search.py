@@ -0,0 +1,188 @@
+import re
+import sqlite3
+
+from phones import canonical_phone, phone_term
+
+# Columns covered by the full-text index, in index order.
+FTS_COLUMNS = ("name", "phone", "email", "group_name", "notes")
+
+# bm25 weight per FTS column: a hit in the name outranks one in the notes.
+BM25_WEIGHTS = (10.0, 5.0, 5.0, 2.0, 1.0)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_column_list = ", ".join(FTS_COLUMNS)
+
+_INDEX_DDL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5(
+            {_column_list}, content='contacts', content_rowid='id', prefix='2 3')""",
+    f"""CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN
+            INSERT INTO contacts_fts(rowid, {_column_list})
+            VALUES (new.id, {", ".join("new." + c for c in FTS_COLUMNS)});
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN
+            INSERT INTO contacts_fts(contacts_fts, rowid, {_column_list})
+            VALUES ('delete', old.id, {", ".join("old." + c for c in FTS_COLUMNS)});
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE ON contacts BEGIN
+            INSERT INTO contacts_fts(contacts_fts, rowid, {_column_list})
+            VALUES ('delete', old.id, {", ".join("old." + c for c in FTS_COLUMNS)});
+            INSERT INTO contacts_fts(rowid, {_column_list})
+            VALUES (new.id, {", ".join("new." + c for c in FTS_COLUMNS)});
+        END""",
+)
+
+_TRIGGERS = ("contacts_fts_ai", "contacts_fts_ad", "contacts_fts_au")
+
+# Characters dropped from a phone before its digits are indexed: the
+# separators phones.phone_term accepts in a search term.
+PHONE_SEPARATORS = " -().+/"
+
+
+def _phone_digits_sql(column):
+    sql = column
+    for char in PHONE_SEPARATORS:
+        sql = f"replace({sql}, '{char}', '')"
+    return sql
+
+
+# The digits of each phone, as typed, in a trigram index: any run of three
+# or more digits is an index lookup. The number is not canonicalized, so
+# "1123" does not match "123-..." through an added country code.
+_PHONE_INDEX_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS contacts_phone_fts USING fts5(digits, content='', tokenize='trigram')",
+    f"""CREATE TRIGGER IF NOT EXISTS contacts_phone_fts_ai AFTER INSERT ON contacts BEGIN
+            INSERT INTO contacts_phone_fts(rowid, digits) VALUES (new.id, {_phone_digits_sql("new.phone")});
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contacts_phone_fts_ad AFTER DELETE ON contacts BEGIN
+            INSERT INTO contacts_phone_fts(contacts_phone_fts, rowid, digits)
+            VALUES ('delete', old.id, {_phone_digits_sql("old.phone")});
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS contacts_phone_fts_au AFTER UPDATE OF phone ON contacts BEGIN
+            INSERT INTO contacts_phone_fts(contacts_phone_fts, rowid, digits)
+            VALUES ('delete', old.id, {_phone_digits_sql("old.phone")});
+            INSERT INTO contacts_phone_fts(rowid, digits) VALUES (new.id, {_phone_digits_sql("new.phone")});
+        END""",
+)
+
+_PHONE_TRIGGERS = ("contacts_phone_fts_ai", "contacts_phone_fts_ad", "contacts_phone_fts_au")
+
+
+def fts5_available(conn, tokenize=None):
+    options = f", tokenize='{tokenize}'" if tokenize else ""
+    try:
+        conn.execute(f"CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x{options})")
+    except sqlite3.OperationalError:
+        return False
+    conn.execute("DROP TABLE temp.fts5_probe")
+    return True
+
+
+def ensure_search_index(conn):
+    """Create the FTS5 index over the contacts table and its sync triggers.
+
+    Returns False when SQLite was built without FTS5. If the triggers are
+    missing (fresh index, or the contacts table was dropped and recreated)
+    the index is rebuilt from the table. Must be called inside a transaction.
+    """
+    if not fts5_available(conn):
+        return False
+    present = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='trigger' AND tbl_name='contacts'")}
+    if all(trigger in present for trigger in _TRIGGERS):
+        return True
+    for statement in _INDEX_DDL:
+        conn.execute(statement)
+    conn.execute("INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')")
+    return True
+
+
+def ensure_phone_index(conn):
+    """Create the trigram index of phone digits behind digit searches, and its sync triggers.
+
+    Returns False when SQLite lacks FTS5 or its trigram tokenizer (before
+    3.34); digit searches then scan. Like ensure_search_index, the index is
+    rebuilt from the table if its triggers are missing.
+    """
+    if not fts5_available(conn, "trigram"):
+        return False
+    present = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='trigger' AND tbl_name='contacts'")}
+    if all(trigger in present for trigger in _PHONE_TRIGGERS):
+        return True
+    for statement in _PHONE_INDEX_DDL:
+        conn.execute(statement)
+    conn.execute("INSERT INTO contacts_phone_fts(contacts_phone_fts) VALUES ('delete-all')")
+    conn.execute(f"INSERT INTO contacts_phone_fts(rowid, digits) SELECT id, {_phone_digits_sql('phone')} FROM contacts")
+    return True
+
+
+def search_index_ready(conn):
+    return _table_exists(conn, "contacts_fts")
+
+
+def phone_index_ready(conn):
+    return _table_exists(conn, "contacts_phone_fts")
+
+
+def _table_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)).fetchone() is not None
+
+
+def fts_query(term):
+    """Turn free text into an FTS5 query matching every word as a prefix.
+
+    Returns None when the term has no indexable characters.
+    """
+    tokens = _TOKEN.findall(term)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def match_clause(term, fts, phone_index=False):
+    """Return a (sql, params) WHERE fragment selecting contacts matching ``term``.
+
+    Terms that look like phone numbers also match a phone containing their
+    digits, however either was punctuated, through the trigram index with
+    ``phone_index``, and the phone that is the same number written another
+    way (see phones.canonical_phone).
+    """
+    query = fts_query(term) if fts else None
+    if query:
+        where, params = "id IN (SELECT rowid FROM contacts_fts WHERE contacts_fts MATCH ?)", [query]
+    else:
+        where = "(" + " OR ".join(f"{column} LIKE ?" for column in FTS_COLUMNS) + ")"
+        params = ['%' + term + '%'] * len(FTS_COLUMNS)
+    digits = phone_term(term)
+    if not digits:
+        return where, params
+    if phone_index:
+        digits_where = "id IN (SELECT rowid FROM contacts_phone_fts WHERE contacts_phone_fts MATCH ?)"
+        params.append(f'"{digits}"')
+    else:
+        digits_where = f"{_phone_digits_sql('phone')} LIKE ?"
+        params.append(f"%{digits}%")
+    params.append(canonical_phone(term))
+    return f"({where} OR {digits_where} OR phone_canonical = ?)", params
+
+
+def search_rows(conn, columns, term, fts, limit=-1, phone_index=False):
+    """Return a cursor over ``columns`` of contacts matching ``term``, best first.
+
+    With the FTS index every word of the term is a prefix query and results
+    are ranked by bm25. Phone-like terms, which also match phone digits,
+    are ordered by name, and so are searches without the index, which fall
+    back to a LIKE scan.
+    """
+    query = fts_query(term) if fts and not phone_term(term) else None
+    selected = ", ".join("c." + column for column in columns)
+    if query:
+        weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+        return conn.execute(
+            f"""SELECT {selected} FROM contacts_fts JOIN contacts c ON c.id = contacts_fts.rowid
+                WHERE contacts_fts MATCH ? ORDER BY bm25(contacts_fts, {weights}) LIMIT ?""",
+            (query, limit))
+    where, params = match_clause(term, fts, phone_index)
+    return conn.execute(
+        f"SELECT {selected} FROM contacts c WHERE {where} ORDER BY c.name LIMIT ?", params + [limit])
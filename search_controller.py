@@ -0,0 +1,107 @@
+import sqlite3
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+from contact_model import PAGE_SIZE
+
+DEBOUNCE_MS = 150
+
+# Rows queried up front for each search, so the list can paint without going
+# back to the database on the GUI thread.
+PRELOAD_ROWS = PAGE_SIZE * 2
+
+# SQLite virtual machine instructions between checks for a newer search.
+_PROGRESS_STEPS = 1000
+
+
+class _SearchTask(QRunnable):
+    def __init__(self, controller, generation, text, group):
+        super().__init__()
+        self.controller = controller
+        self.generation = generation
+        self.text = text
+        self.group = group
+
+    def stale(self):
+        return self.generation != self.controller._generation
+
+    def run(self):
+        if self.stale():
+            return
+        controller = self.controller
+        repository = controller.repository
+        conn = repository.connection()
+        # Returning non-zero aborts the running statement once newer input arrives.
+        conn.set_progress_handler(self.stale, _PROGRESS_STEPS)
+        try:
+            contacts = repository.page(self.text, limit=PRELOAD_ROWS, group=self.group)
+            total = len(contacts) if len(contacts) < PRELOAD_ROWS else repository.count(self.text, self.group)
+        except sqlite3.Error as e:
+            if not self.stale():
+                controller._failed.emit(self.generation, str(e))
+            return
+        finally:
+            conn.set_progress_handler(None, 0)
+        controller._finished.emit(self.generation, self.text, self.group, contacts, total)
+
+
+class SearchController(QObject):
+    """Debounces search input and runs the query on a worker thread.
+
+    Queries go through ``repository``, whose ConnectionManager gives each
+    pool thread its own connection. Each request bumps a generation
+    counter. Work for an older generation is skipped if it has not
+    started, aborted through SQLite's progress handler if it is running,
+    and dropped if it finishes anyway, so only the latest input ever
+    reaches ``resultsReady(text, group, contacts, total)``. A ``group`` of
+    None searches every group.
+    """
+
+    resultsReady = pyqtSignal(str, object, object, int)
+    searchFailed = pyqtSignal(str)
+
+    _finished = pyqtSignal(int, str, object, object, int)
+    _failed = pyqtSignal(int, str)
+
+    def __init__(self, repository, debounce_ms=DEBOUNCE_MS, parent=None):
+        super().__init__(parent)
+        self.repository = repository
+        self._generation = 0
+        self._text = ""
+        self._group = None
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(2)
+        # Worker threads keep their connection for the repository's lifetime.
+        self._pool.setExpiryTimeout(-1)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self._start)
+        self._finished.connect(self._deliver)
+        self._failed.connect(self._report_failure)
+
+    def request(self, text, immediate=False, group=None):
+        self._text = text
+        self._group = group
+        self._generation += 1
+        if immediate:
+            self._timer.stop()
+            self._start()
+        else:
+            self._timer.start()
+
+    def close(self):
+        self._timer.stop()
+        self._generation += 1
+        self._pool.waitForDone()
+
+    def _start(self):
+        self._pool.start(_SearchTask(self, self._generation, self._text, self._group))
+
+    def _deliver(self, generation, text, group, contacts, total):
+        if generation == self._generation:
+            self.resultsReady.emit(text, group, contacts, total)
+
+    def _report_failure(self, generation, message):
+        if generation == self._generation:
+            self.searchFailed.emit(message)
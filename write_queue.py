@@ -0,0 +1,113 @@
+"""One writer thread that commits the writes of many threads together.
+
+Threads that write through their own connections queue up on SQLite's
+write lock and pay a commit each. A WriteQueue runs every write on a
+single thread instead: whatever writes are waiting when the writer comes
+free go into one transaction, each in its own savepoint, and are
+committed at once (a group commit). Under contention the commits are
+shared; with a single writer each write is still committed on its own,
+so nothing waits on a timer unless ``max_delay`` asks for it.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+DEFAULT_MAX_BATCH = 500
+
+
+class WriteQueue:
+    """Runs submitted write functions on one thread, ``max_batch`` per transaction at most.
+
+    A function that raises rolls back only its own savepoint; its caller
+    gets the exception and the rest of the group still commits. Results
+    are handed back only once the group is committed.
+    """
+
+    def __init__(self, db, max_batch=DEFAULT_MAX_BATCH, max_delay=0.0):
+        self._db = db
+        self.max_batch = max_batch
+        # Seconds the writer waits for more writes to join a group.
+        self.max_delay = max_delay
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self.groups = 0
+        self.writes = 0
+        self._thread = threading.Thread(target=self._run, name="address-book-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, func):
+        """Queue ``func`` to be called on the writer thread; returns a Future of its result."""
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("write queue is closed")
+            self._queue.put((func, future))
+        return future
+
+    def write(self, func):
+        """Run ``func`` on the writer thread and return its result once committed.
+
+        A caller already inside db.transaction() holds the write lock the
+        writer thread would wait for, so ``func`` runs inline in that
+        transaction instead, and commits with it.
+        """
+        if threading.current_thread() is self._thread or self._db.in_transaction():
+            # A queued write writing again is already in the group's transaction.
+            return func()
+        return self.submit(func).result()
+
+    def close(self):
+        """Commit the writes already queued, then stop the writer thread."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            group = [item]
+            deadline = time.perf_counter() + self.max_delay
+            stop = False
+            while len(group) < self.max_batch:
+                try:
+                    wait = deadline - time.perf_counter()
+                    item = self._queue.get(timeout=wait) if wait > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                group.append(item)
+            self._commit(group)
+            if stop:
+                return
+
+    def _commit(self, group):
+        group = [(func, future) for func, future in group if future.set_running_or_notify_cancel()]
+        outcomes = []
+        try:
+            with self._db.transaction():
+                for func, _ in group:
+                    try:
+                        with self._db.transaction():
+                            outcomes.append((True, func()))
+                    except Exception as e:
+                        outcomes.append((False, e))
+        except Exception as e:
+            for _, future in group:
+                future.set_exception(e)
+            return
+        self.groups += 1
+        self.writes += len(group)
+        for (_, future), (ok, value) in zip(group, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)